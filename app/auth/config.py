@@ -1,18 +1,56 @@
 # LOCAL CONFIGS FOR AUTHENTICATION
 ### IMPORTS ###
 # External Libraries
-from pydantic_settings import BaseSettings
 
 # Internal Libraries
+from app.config import BaseConfig
 
 
 ### CODE ###
 
 
-class AuthConfig(BaseSettings):
+class AuthConfig(BaseConfig):
     JWT_SECRET: str = "example"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE: int = 5  # minutes
+    # Only used by asymmetric algorithms ("RS256", "ES256", "EdDSA", ...), a JSON
+    # object of key id to PEM file, every key verifies and is published at
+    # "/.well-known/jwks.json", the private key JWT_SIGNING_KEY_ID signs
+    JWT_KEY_FILES: dict[str, str] = {}
+    JWT_SIGNING_KEY_ID: str | None = None
+    # Seconds other services may cache "/.well-known/jwks.json", publish a new key
+    # at least this long before signing with it
+    JWKS_MAX_AGE: int = 300
+    # Refresh tokens trade for a new access token at "/api/token/refresh" without
+    # the password, every refresh also replaces the refresh token
+    REFRESH_TOKEN_EXPIRE: int = 60 * 24 * 30  # minutes
+    # Replaced refresh tokens are kept this long to tell when one is used again, and
+    # revoke its family, then deleted with the expired ones on every revocation
+    # rebuild, a token replaced longer ago is only rejected
+    REFRESH_TOKEN_REUSE_WINDOW: int = 60 * 24  # minutes
+    # Verified tokens kept in memory until they expire, 0 disables the cache
+    JWT_CACHE_SIZE: int = 4096
+    # Users loaded by "get_current_user" are kept in memory for USER_CACHE_TTL seconds,
+    # USER_CACHE_SIZE=0 disables the cache
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL: int = 60
+    # Cost of new password hashes, every round doubles the time of a hash and a login
+    BCRYPT_ROUNDS: int = 12
+    # When above 0, BCRYPT_ROUNDS is replaced on startup by the highest cost that
+    # hashes within this many seconds on the machine, never below BCRYPT_MIN_ROUNDS.
+    # Logins rehash passwords made with a lower cost than the current one
+    BCRYPT_TARGET_SECONDS: float = 0
+    BCRYPT_MIN_ROUNDS: int = 10
+    # Every worker reads new access token revocations this often, and rebuilds its
+    # Bloom filter of all of them this often
+    REVOCATION_REFRESH_SECONDS: float = 5
+    REVOCATION_REBUILD_SECONDS: float = 300
+    # Share of not revoked tokens the Bloom filter sends to the database
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    # bcrypt runs on this many threads, so it never blocks the event loop
+    PASSWORD_HASH_WORKERS: int = 4
+    # Hashes waiting for a thread, past this the request is rejected with 503
+    PASSWORD_HASH_MAX_PENDING: int = 64
 
 
 auth_config = AuthConfig()
@@ -1,31 +1,47 @@
 ### IMPORTS ###
 # External Libraries
+import hashlib
 import jwt
+import time
 from datetime import datetime, timezone
 from typing import Any, Annotated
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql.expression import Select, select
 
 
 # Internal Libraries
 from app.auth.config import auth_config
+from app.cache import LRUCache, monitored_caches
 from app.auth import schemas, models
 from app.auth.exceptions import credentials_exception, user_not_found
-from app.database import get_session
+from app.auth.keys import key_ring
+from app.auth.revocation import revocation_list
+from app.database import get_read_session
 
-oauth = OAuth2PasswordBearer(tokenUrl="/api/token")
+oauth = OAuth2PasswordBearer(tokenUrl="/api/token", refreshUrl="/api/token/refresh")
 
+# Verified payloads by token digest, entries expire together with their token,
+# "token_cache.stats()" has the hit/miss counters to size it
+token_cache = LRUCache(auth_config.JWT_CACHE_SIZE)
+
+# Detached snapshots of users by username, every route that writes a user
+# has to call "user_cache.delete(username)" after committing
+user_cache = LRUCache(auth_config.USER_CACHE_SIZE)
+
+monitored_caches.update(jwt=token_cache, user=user_cache)
+
+
+def _verify_access_token(access_token: str) -> schemas.Payload:
+    # The digest keeps the cache keys small and the raw tokens out of memory
+    cache_key = hashlib.sha256(access_token.encode()).digest()
+    payload: schemas.Payload | None = token_cache.get(cache_key)
+    if payload is not None:
+        return payload
 
-def get_access_token_payload(
-    # Only use Annotated for FastAPI dependencies,
-    # For custom made things use "param: Type = Depends(dependency)"
-    access_token: Annotated[str, Depends(oauth)],
-) -> schemas.Payload:
     try:
-        decoded_jwt: dict[str, Any] = jwt.decode(
-            access_token, auth_config.JWT_SECRET, auth_config.JWT_ALGORITHM
-        )
+        decoded_jwt: dict[str, Any] = key_ring.decode(access_token)
         # If JWT is expired, it will throw an error here, so we don't need to check
         # if the token expired or not later, everything is checked automatically here
         # and InvalidTokenError is base for ExpiredSignatureError so it will be caught
@@ -41,20 +57,61 @@ def get_access_token_payload(
     if expire is None:
         raise credentials_exception
 
-    return schemas.Payload(
+    payload = schemas.Payload(
         sub=username,
         # fromtimestamp expects Unix Timepstamp in seconds,
         # if you have it in milliseconds, you have to divide it by 1000
         exp=datetime.fromtimestamp(expire, timezone.utc),
+        jti=decoded_jwt.get("jti"),
     )
+    token_cache.set(cache_key, payload, expires_at=expire)
+    return payload
+
+
+async def get_access_token_payload(
+    # Only use Annotated for FastAPI dependencies,
+    # For custom made things use "param: Type = Depends(dependency)"
+    access_token: Annotated[str, Depends(oauth)],
+    session: AsyncSession = Depends(get_read_session),
+) -> schemas.Payload:
+    payload = _verify_access_token(access_token)
+    # Checked on every request, also when the payload came from "token_cache".
+    # Answered in memory unless the Bloom filter of revoked tokens has a hit
+    if payload.jti is not None and await revocation_list.is_revoked(
+        session, payload.jti
+    ):
+        raise credentials_exception
+    return payload
+
+
+def select_user(username: str) -> Select:
+    # A Core select of the table, the row is validated as is without
+    # creating an ORM object that would only be thrown away
+    return select(models.User.__table__).where(models.User.username == username)
+
+
+async def warm_up(session: AsyncSession):
+    # Prepares the statement of "get_current_user" on the connection of "session"
+    await session.execute(select_user(""))
 
 
 async def get_current_user(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     payload: schemas.Payload = Depends(get_access_token_payload),
-):
-    try:
-        user = await session.get_one(models.User, payload.sub)
-    except Exception:
+) -> schemas.User:
+    # The session only checks out a connection on its first query,
+    # so a cache hit never touches the database
+    user: schemas.User | None = user_cache.get(payload.sub)
+    if user is not None:
+        return user
+
+    query_res = await session.execute(select_user(payload.sub))
+    db_user = query_res.one_or_none()
+    if db_user is None:
         raise user_not_found
+
+    user = schemas.User.model_validate(db_user)
+    user_cache.set(
+        payload.sub, user, expires_at=time.time() + auth_config.USER_CACHE_TTL
+    )
     return user
@@ -21,6 +21,20 @@ user_already_registered = HTTPException(
 )
 
 
+invalid_refresh_token = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Invalid refresh token",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials"
 )
+
+
+password_hashing_overloaded = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many concurrent logins, try again later",
+    headers={"Retry-After": "1"},
+)
@@ -0,0 +1,94 @@
+### IMPORTS ###
+# External Libraries
+import json
+import jwt
+from typing import Any
+
+
+# Internal Libraries
+from app.auth.config import auth_config
+
+
+### CODE ###
+
+
+class KeyRing:
+    """
+    The keys access tokens are signed and verified with, read and parsed once, so
+    no request parses a PEM file again.
+
+    With an HMAC algorithm ("HS256", the default) "secret" signs and verifies and
+    nothing is published. With an asymmetric one ("RS256", "ES256", "EdDSA", ...)
+    every key of "key_files" verifies the tokens whose "kid" header is its id and
+    is published by "/.well-known/jwks.json", while only "signing_key_id" signs.
+
+    Rotating is done in three deploys: add the new key to "key_files", once the
+    JWKS caches have it switch "signing_key_id" to it, once the last token of the
+    old key has expired remove the old key.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        secret: str,
+        key_files: dict[str, str],
+        signing_key_id: str | None,
+    ):
+        self.algorithm = algorithm
+        self.signing_key_id = signing_key_id
+        self._signing_key: Any = secret
+        self._verification_keys: dict[str, Any] = {}
+        # The body of "/.well-known/jwks.json", it only changes on restart
+        self.jwks_json = b'{"keys":[]}'
+        if algorithm.startswith("HS"):
+            return
+
+        algo = jwt.get_algorithm_by_name(algorithm)
+        jwks = []
+        for kid, path in key_files.items():
+            with open(path, "rb") as file:
+                key = algo.prepare_key(file.read())
+            # Only private keys have "public_key()", a public key file can verify
+            # tokens of another instance but cannot sign
+            if hasattr(key, "public_key"):
+                if kid == signing_key_id:
+                    self._signing_key = key
+                key = key.public_key()
+            self._verification_keys[kid] = key
+            jwk = algo.to_jwk(key, as_dict=True)
+            jwks.append({**jwk, "kid": kid, "use": "sig", "alg": algorithm})
+        self.jwks_json = json.dumps({"keys": jwks}).encode()
+
+        if self._signing_key is secret:
+            raise ValueError(
+                f'JWT_SIGNING_KEY_ID "{signing_key_id}" is not a private key of '
+                "JWT_KEY_FILES, it is needed to sign with " + algorithm
+            )
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        headers = {"kid": self.signing_key_id} if self._verification_keys else None
+        return jwt.encode(
+            payload, self._signing_key, algorithm=self.algorithm, headers=headers
+        )
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """
+        :raise jwt.InvalidTokenError: when the token is invalid, expired or was
+            signed by a key that is not in the ring
+        """
+        if not self._verification_keys:
+            return jwt.decode(token, self._signing_key, algorithms=[self.algorithm])
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._verification_keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown key id {kid!r}")
+        # Only the configured algorithm, a token cannot pick a weaker one
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+
+key_ring = KeyRing(
+    auth_config.JWT_ALGORITHM,
+    auth_config.JWT_SECRET,
+    auth_config.JWT_KEY_FILES,
+    auth_config.JWT_SIGNING_KEY_ID,
+)
@@ -1,8 +1,11 @@
 ### IMPORTS ###
 # External Libraries
 from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy.schema import ForeignKey
+from sqlalchemy.sql.functions import now
 from sqlalchemy.sql.sqltypes import DATETIME_TIMEZONE
 from datetime import datetime, timezone
+from uuid import UUID
 
 
 # Internal Libraries
@@ -15,11 +18,52 @@ from app.models import Base
 class User(Base):
     __tablename__ = "users"
     username: Mapped[str] = mapped_column(unique=True, index=True, primary_key=True)
+    # The bcrypt hash embeds its cost and salt: "$2b$<cost>$<22 chars of salt><hash>"
     password_hash: Mapped[str]
     # You can pass function to "default" parameter, "default_factory" does not work
     # "default_factory" can only be used when you use "MappedAsDataclass" mixin
     # Useful link: https://docs.sqlalchemy.org/en/20/orm/dataclasses.html
-    salt: Mapped[str]
     created_at: Mapped[datetime] = mapped_column(
         DATETIME_TIMEZONE, default=lambda: datetime.now(tz=timezone.utc)
     )
+
+
+class RefreshToken(Base):
+    """
+    Refresh tokens are random strings, only their SHA-256 digest is stored, so a
+    leaked table cannot be used to refresh. Every refresh revokes the token it
+    was given and issues the next one of the same family (one login). A revoked
+    token that comes back was copied, so the whole family is revoked.
+    """
+
+    __tablename__ = "refresh_tokens"
+    token_hash: Mapped[bytes] = mapped_column(primary_key=True)
+    username: Mapped[str] = mapped_column(
+        ForeignKey("users.username", ondelete="CASCADE", onupdate="CASCADE"),
+        index=True,
+    )
+    family_id: Mapped[UUID] = mapped_column(index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DATETIME_TIMEZONE, default=lambda: datetime.now(tz=timezone.utc)
+    )
+    expires_at: Mapped[datetime] = mapped_column(DATETIME_TIMEZONE)
+    revoked_at: Mapped[datetime | None] = mapped_column(DATETIME_TIMEZONE)
+
+
+class RevokedToken(Base):
+    """
+    Access tokens revoked before they expired, by their "jti" claim. A row is
+    useless once "expires_at" (the "exp" of the token) passed, rebuilding the
+    revocation list deletes it. "revoked_at" is set by the database, so the workers
+    reading new revocations compare it with the same clock.
+    """
+
+    __tablename__ = "revoked_tokens"
+    jti: Mapped[str] = mapped_column(primary_key=True)
+    username: Mapped[str] = mapped_column(
+        ForeignKey("users.username", ondelete="CASCADE", onupdate="CASCADE")
+    )
+    expires_at: Mapped[datetime] = mapped_column(DATETIME_TIMEZONE, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(
+        DATETIME_TIMEZONE, server_default=now(), index=True
+    )
@@ -0,0 +1,237 @@
+### IMPORTS ###
+# External Libraries
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql.expression import delete, or_, select
+from sqlalchemy.sql.functions import now
+
+
+# Internal Libraries
+from app.auth import models
+from app.auth.config import auth_config
+from app.database import AsyncSessionFactory
+from app.metrics import registry
+
+
+### CODE ###
+
+logger = logging.getLogger("app.auth.revocation")
+
+revocation_checks = registry.counter(
+    "token_revocation_checks_total",
+    "Access tokens checked for revocation, by what answered: recent, bloom, "
+    "confirmed or database",
+    ("source",),
+)
+
+# Revocations committed by another worker while a rebuild read the table are
+# picked up by the next refreshes, which read this far before the rebuild
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """
+    Set of strings that answers "maybe in it" or "surely not in it" in a few bits
+    per item, sized for "capacity" items with "error_rate" false positives.
+    The "hashes" bit positions come from one hash of the key (double hashing).
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(64, math.ceil(bits))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> range:
+        # The str hash of Python (SipHash) is seeded per process, which is fine for
+        # a filter that never leaves it, and its 64 bits make two 32 bit hashes
+        key_hash = hash(key) & 0xFFFFFFFFFFFFFFFF
+        first = key_hash & 0xFFFFFFFF
+        # Odd, so the steps never repeat a position before wrapping around
+        step = (key_hash >> 32) | 1
+        # Positions before the modulo, "first + i * step" for every hash
+        return range(first, first + self.hashes * step, step)
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            position %= self.size
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        # A plain loop, it stops at the first unset bit, which is most of the time
+        # right at the first one for a key that was never added
+        size, bits = self.size, self._bits
+        for position in self._positions(key):
+            position %= size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    """
+    The "jti" of the revoked access tokens that have not expired yet, kept in memory
+    by every worker so that checking a token that is not revoked, nearly all of
+    them, never touches the database:
+
+    - "recent" has the exact ids revoked since the last rebuild, it is refreshed
+      every few seconds and the revocations of this worker are added right away
+    - the Bloom filter has every revoked id as of the last rebuild, a miss means
+      not revoked, a hit is confirmed with the database (it can be a false positive)
+      and the answer is remembered until the next rebuild
+
+    Revocations made by another worker take up to "REVOCATION_REFRESH_SECONDS"
+    to be seen. Until the first rebuild worked every token is checked in the
+    database, an empty filter would let every revoked token through.
+    """
+
+    def __init__(self, error_rate: float):
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(0, error_rate)
+        self._recent: set[str] = set()
+        # Bloom filter hits the database answered for, by jti
+        self._confirmed: dict[str, bool] = {}
+        # Database time of the last rebuild, None before the first one, and the
+        # "time.monotonic()" of it to schedule the next one
+        self._rebuilt_at: datetime | None = None
+        self._rebuilt_monotonic = 0.0
+        # Revocations of this worker made while a rebuild reads the table, they go
+        # into the "recent" set the rebuild swaps in
+        self._added_while_rebuilding: set[str] | None = None
+
+    def add(self, jti: str):
+        self._recent.add(jti)
+        if self._added_while_rebuilding is not None:
+            self._added_while_rebuilding.add(jti)
+
+    def check(self, jti: str) -> bool | None:
+        """
+        :return: True if revoked, False if not, None when the database has to tell,
+            call "is_revoked" then
+        """
+        if jti in self._recent:
+            revocation_checks.inc(("recent",))
+            return True
+        if self._rebuilt_at is None:
+            return None
+        if jti not in self._bloom:
+            revocation_checks.inc(("bloom",))
+            return False
+        confirmed = self._confirmed.get(jti)
+        if confirmed is not None:
+            revocation_checks.inc(("confirmed",))
+        return confirmed
+
+    async def is_revoked(self, session: AsyncSession, jti: str) -> bool:
+        revoked = self.check(jti)
+        if revoked is not None:
+            return revoked
+        revocation_checks.inc(("database",))
+        query_res = await session.execute(
+            select(models.RevokedToken.jti).where(models.RevokedToken.jti == jti)
+        )
+        revoked = query_res.first() is not None
+        # Before the first rebuild there is no "refresh" to tell when it changes
+        if self._rebuilt_at is not None:
+            self._confirmed[jti] = revoked
+        return revoked
+
+    async def rebuild(self, session: AsyncSession):
+        """
+        Load every revocation that has not expired into a new Bloom filter sized for
+        them, dropping the expired ones from the table on the way. The new filter
+        and "recent" set are swapped in together once both are read.
+
+        The refresh tokens that expired or were revoked more than
+        "REFRESH_TOKEN_REUSE_WINDOW" ago are deleted too, every refresh adds a row.
+        """
+        token = models.RevokedToken
+        await session.execute(delete(token).where(token.expires_at <= now()))
+        refresh_token = models.RefreshToken
+        reuse_window = timedelta(minutes=auth_config.REFRESH_TOKEN_REUSE_WINDOW)
+        await session.execute(
+            delete(refresh_token).where(
+                or_(
+                    refresh_token.expires_at <= now(),
+                    refresh_token.revoked_at <= now() - reuse_window,
+                )
+            )
+        )
+        await session.commit()
+
+        self._added_while_rebuilding = set()
+        try:
+            rebuilt_at = (await session.execute(select(now()))).scalar_one()
+            query_res = await session.execute(select(token.jti))
+            jtis = query_res.scalars().all()
+            # Twice the room, the filter has to last until the next rebuild
+            bloom = BloomFilter(len(jtis) * 2, self.error_rate)
+            for jti in jtis:
+                bloom.add(jti)
+            # What was committed while the table was read
+            recent = await self._revoked_since(session, rebuilt_at)
+            recent |= self._added_while_rebuilding
+        finally:
+            self._added_while_rebuilding = None
+
+        self._bloom = bloom
+        self._recent = recent
+        self._confirmed = {}
+        self._rebuilt_at = rebuilt_at
+        self._rebuilt_monotonic = time.monotonic()
+
+    async def _revoked_since(self, session: AsyncSession, rebuilt_at: datetime) -> set:
+        token = models.RevokedToken
+        query_res = await session.execute(
+            select(token.jti).where(token.revoked_at > rebuilt_at - REFRESH_OVERLAP)
+        )
+        return set(query_res.scalars().all())
+
+    async def refresh(self, session: AsyncSession):
+        """
+        Add the revocations made since the last rebuild to "recent".
+        """
+        if self._rebuilt_at is None:
+            return
+        self._recent.update(await self._revoked_since(session, self._rebuilt_at))
+
+    async def update(self, rebuild: bool) -> bool:
+        """
+        Rebuild or refresh on a session of its own. Errors are logged, until the
+        next update succeeds the list answers with what it has.
+
+        :return: False if it failed
+        """
+        try:
+            async with AsyncSessionFactory() as session:
+                if rebuild:
+                    await self.rebuild(session)
+                else:
+                    await self.refresh(session)
+        except (OSError, DBAPIError) as error:
+            logger.warning("Could not load the revoked tokens: %s", error)
+            return False
+        return True
+
+    async def keep_fresh(self, refresh_seconds: float, rebuild_seconds: float):
+        """
+        Runs until cancelled, after a first "update(rebuild=True)". Refreshes every
+        "refresh_seconds" and rebuilds every "rebuild_seconds", or until a rebuild
+        worked if none did.
+        """
+        while True:
+            await asyncio.sleep(refresh_seconds)
+            rebuild = (
+                self._rebuilt_at is None
+                or time.monotonic() - self._rebuilt_monotonic >= rebuild_seconds
+            )
+            await self.update(rebuild)
+
+
+revocation_list = RevocationList(auth_config.REVOCATION_BLOOM_ERROR_RATE)
@@ -1,18 +1,22 @@
 ### IMPORTS ###
 # External Libraries
-from fastapi import APIRouter, status, Depends
+from fastapi import APIRouter, Form, Response, status, Depends
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
-import bcrypt
 from sqlalchemy.exc import IntegrityError
 
 # Internal Libraries
-from app.auth import models, schemas
+from app.auth import models, schemas, service
 from app.auth.config import auth_config
 from app.database import get_session
 from app.auth.exceptions import user_not_found, wrong_password, user_already_registered
-from app.auth.utils import create_access_token
-from app.auth.dependencies import get_current_user
+from app.auth.utils import create_access_token, password_hasher
+from app.auth.dependencies import (
+    get_access_token_payload,
+    get_current_user,
+    user_cache,
+)
+from app.auth.keys import key_ring
 from typing import Annotated
 
 
@@ -35,14 +39,63 @@ async def login_for_access_token(
     except Exception:
         raise user_not_found
 
-    if not bcrypt.checkpw(
-        form_data.password.encode(encoding="utf-8"),
-        user.password_hash.encode(encoding="utf-8"),
-    ):
+    if not await password_hasher.verify(form_data.password, user.password_hash):
         raise wrong_password
 
+    # The password is only known here, so hashes made with an older, lower cost
+    # are upgraded on login, committed together with the refresh token
+    new_hash = await password_hasher.rehash(form_data.password, user.password_hash)
+    if new_hash is not None:
+        user.password_hash = new_hash
+
+    refresh_token = service.issue_refresh_token(session, user.username)
+    await session.commit()
+    if new_hash is not None:
+        user_cache.delete(user.username)
+
     access_token = create_access_token(user.username, auth_config.JWT_EXPIRE)
-    return schemas.Token(access_token=access_token, token_type="Bearer")
+    return schemas.Token(
+        access_token=access_token, token_type="Bearer", refresh_token=refresh_token
+    )
+
+
+@router.post(
+    "/api/token/refresh",
+    response_model=schemas.Token,
+    status_code=status.HTTP_201_CREATED,
+)
+async def refresh_access_token(
+    # A form field like "/api/token", the refresh token grant of OAuth2
+    refresh_token: Annotated[str, Form()],
+    session: AsyncSession = Depends(get_session),
+):
+    # One indexed UPDATE instead of a bcrypt check, the returned refresh token
+    # replaces the one sent, which cannot be used again
+    username, refresh_token = await service.rotate_refresh_token(session, refresh_token)
+    access_token = create_access_token(username, auth_config.JWT_EXPIRE)
+    return schemas.Token(
+        access_token=access_token, token_type="Bearer", refresh_token=refresh_token
+    )
+
+
+@router.post("/api/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_refresh_token(
+    refresh_token: Annotated[str, Form()],
+    session: AsyncSession = Depends(get_session),
+):
+    await service.revoke_refresh_token(session, refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    payload: schemas.Payload = Depends(get_access_token_payload),
+    # Optional, revokes the refresh tokens of the login as well
+    refresh_token: Annotated[str | None, Form()] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    await service.revoke_access_token(session, payload)
+    if refresh_token is not None:
+        await service.revoke_refresh_token(session, refresh_token)
 
 
 @router.post(
@@ -52,21 +105,31 @@ async def create_user(
     data: schemas.UserCreate, session: AsyncSession = Depends(get_session)
 ):
     username = data.username
-    salt = bcrypt.gensalt()
-    password_hash = bcrypt.hashpw(data.password.encode(), salt)
+    password_hash = await password_hasher.hash(data.password)
 
-    new_user = models.User(
-        username=username, salt=salt.decode(), password_hash=password_hash.decode()
-    )
+    # bcrypt hashes start with the salt they were made with: "$2b$<cost>$<22 chars>"
+    new_user = models.User(username=username, password_hash=password_hash)
     session.add(new_user)
     try:
         await session.commit()
         await session.refresh(new_user)
     except IntegrityError:
         raise user_already_registered()
+    user_cache.delete(username)
     return new_user
 
 
 @router.get("/users/me", response_model=schemas.User, status_code=status.HTTP_200_OK)
 async def get_current_user(user: schemas.User = Depends(get_current_user)):
     return user
+
+
+@router.get("/.well-known/jwks.json", status_code=status.HTTP_200_OK)
+async def get_jwks():
+    # The public keys, other services verify access tokens with them instead of
+    # calling "/users/me", empty with an HMAC "JWT_ALGORITHM"
+    return Response(
+        content=key_ring.jwks_json,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={auth_config.JWKS_MAX_AGE}"},
+    )
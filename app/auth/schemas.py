@@ -12,11 +12,14 @@ from datetime import datetime
 class Token(BaseModel):
     access_token: str
     token_type: str = "Bearer"
+    refresh_token: str
 
 
 class Payload(BaseModel):
     sub: str
     exp: datetime
+    # Tokens issued before it existed have none and cannot be revoked
+    jti: str | None = None
 
 
 class UserBase(BaseModel):
@@ -29,6 +32,5 @@ class UserCreate(UserBase):
 
 class User(UserBase):
     password_hash: str
-    salt: str
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
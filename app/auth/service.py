@@ -0,0 +1,125 @@
+### IMPORTS ###
+# External Libraries
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql.expression import select, update
+
+# Internal Libraries
+from app.auth import models, schemas
+from app.auth.config import auth_config
+from app.auth.exceptions import invalid_refresh_token
+from app.auth.revocation import revocation_list
+
+
+### CODE ###
+
+
+def _digest(refresh_token: str) -> bytes:
+    # The tokens are 256 random bits, a fast hash is enough, unlike passwords
+    # they cannot be guessed from a dictionary
+    return hashlib.sha256(refresh_token.encode()).digest()
+
+
+def issue_refresh_token(
+    session: AsyncSession, username: str, family_id: UUID | None = None
+) -> str:
+    """
+    Add a new refresh token of "username" to "session", the caller commits it.
+
+    :param family_id: of the token it replaces, None starts a new family (a login)
+    :return: the token, it is only known to the client from now on
+    """
+    refresh_token = secrets.token_urlsafe(32)
+    session.add(
+        models.RefreshToken(
+            token_hash=_digest(refresh_token),
+            username=username,
+            family_id=family_id or uuid4(),
+            expires_at=datetime.now(timezone.utc)
+            + timedelta(minutes=auth_config.REFRESH_TOKEN_EXPIRE),
+        )
+    )
+    return refresh_token
+
+
+def _revoke_family(token_hash: bytes, now: datetime, only_if_revoked: bool = False):
+    token = models.RefreshToken
+    family = select(token.family_id).where(token.token_hash == token_hash)
+    if only_if_revoked:
+        family = family.where(token.revoked_at.is_not(None))
+    return (
+        update(token)
+        .where(token.family_id == family.scalar_subquery(), token.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rotate_refresh_token(
+    session: AsyncSession, refresh_token: str
+) -> tuple[str, str]:
+    """
+    Revoke "refresh_token" and issue the next token of its family. One UPDATE finds
+    and revokes it, so of two concurrent refreshes with the same token only one wins.
+
+    A token that was already revoked by a refresh is being used a second time, by
+    whoever copied it or by the client it was copied from, so its whole family is
+    revoked and both have to log in again.
+
+    :return: the username and the new refresh token
+    """
+    token = models.RefreshToken
+    token_hash = _digest(refresh_token)
+    now = datetime.now(timezone.utc)
+    query_res = await session.execute(
+        update(token)
+        .where(
+            token.token_hash == token_hash,
+            token.revoked_at.is_(None),
+            token.expires_at > now,
+        )
+        .values(revoked_at=now)
+        .returning(token.username, token.family_id)
+        .execution_options(synchronize_session=False)
+    )
+    row = query_res.one_or_none()
+    if row is None:
+        await session.execute(_revoke_family(token_hash, now, only_if_revoked=True))
+        await session.commit()
+        raise invalid_refresh_token
+
+    new_refresh_token = issue_refresh_token(session, row.username, row.family_id)
+    await session.commit()
+    return row.username, new_refresh_token
+
+
+async def revoke_refresh_token(session: AsyncSession, refresh_token: str):
+    """
+    Revoke the family of "refresh_token", the login it came from, unknown tokens
+    are ignored. Access tokens already issued stay valid until they expire, unless
+    they are revoked with "revoke_access_token".
+    """
+    await session.execute(
+        _revoke_family(_digest(refresh_token), datetime.now(timezone.utc))
+    )
+    await session.commit()
+
+
+async def revoke_access_token(session: AsyncSession, payload: schemas.Payload):
+    """
+    Revoke the access token of "payload" until it expires. This worker rejects it
+    right away, the others once they refreshed their revocation list.
+    """
+    if payload.jti is None:
+        return
+    await session.execute(
+        pg_insert(models.RevokedToken)
+        .values(jti=payload.jti, username=payload.sub, expires_at=payload.exp)
+        .on_conflict_do_nothing()
+    )
+    await session.commit()
+    revocation_list.add(payload.jti)
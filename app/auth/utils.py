@@ -1,22 +1,155 @@
 ### IMPORTS ###
 # External Libraries
-import jwt
+import asyncio
+import bcrypt
+import math
+import secrets
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime, timezone
 
 
 # Internal Libraries
 from app.auth.config import auth_config
+from app.auth.exceptions import password_hashing_overloaded
+from app.auth.keys import key_ring
+from app.metrics import registry
 
 
 ### CODE ###
 
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds",
+    "Time bcrypt ran on the thread pool, without the wait for a free thread",
+    ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+password_hash_rounds = registry.gauge(
+    "password_hash_rounds", "bcrypt cost new password hashes are made with"
+)
+
+# Highest cost bcrypt accepts, every round doubles the time
+MAX_ROUNDS = 31
+# Cheap enough to time quickly, slow enough to not be all overhead
+CALIBRATION_ROUNDS = 8
+
 
 def create_access_token(username: str, expire_in_minutes: int):
     payload = {
         "sub": username,
         "exp": datetime.now(timezone.utc) + timedelta(minutes=expire_in_minutes),
+        # Token id, "/logout" revokes the token by it
+        "jti": secrets.token_urlsafe(16),
     }
-    encoded_jwt = jwt.encode(
-        payload=payload, key=auth_config.JWT_SECRET, algorithm=auth_config.JWT_ALGORITHM
-    )
-    return encoded_jwt
+    return key_ring.encode(payload)
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def _verify_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode(), password_hash.encode())
+
+
+def hash_rounds(password_hash: str) -> int:
+    # bcrypt hashes start with "$2b$<cost>$<22 chars of salt>"
+    return int(password_hash.split("$")[2])
+
+
+def _timed(func, *args):
+    # Runs on the worker thread, the metric is updated back on the event loop
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded thread pool, bcrypt releases the GIL while hashing
+    so the threads run in parallel and the event loop keeps serving other requests.
+
+    When "max_pending" hashes are already queued or running, new ones are rejected
+    with 503 instead of piling up and making every login time out.
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        # Threads are only started on first use
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt"
+        )
+        self._max_pending = max_pending
+        self._pending = 0
+        self.rounds = rounds
+        password_hash_rounds.set(rounds)
+
+    async def _run(self, operation: str, func, *args):
+        # No lock needed, this only runs on the event loop thread
+        if self._pending >= self._max_pending:
+            raise password_hashing_overloaded
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(
+                self._executor, _timed, func, *args
+            )
+        finally:
+            self._pending -= 1
+        password_hash_duration.observe(elapsed, (operation,))
+        return result
+
+    async def hash(self, password: str) -> str:
+        """
+        :return: the bcrypt hash, the salt is embedded in its first 29 characters
+        """
+        return await self._run("hash", _hash_password, password, self.rounds)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run("verify", _verify_password, password, password_hash)
+
+    async def rehash(self, password: str, password_hash: str) -> str | None:
+        """
+        Call it after "password" was verified against "password_hash", hashes made
+        with a lower cost than "rounds" are hashed again at the current cost.
+        Only upgrades, workers calibrated to different costs do not undo each other.
+
+        :return: the new hash, None when it is up to date or the pool is too busy,
+            the next login tries again
+        """
+        if hash_rounds(password_hash) >= self.rounds:
+            return None
+        if self._pending >= self._max_pending:
+            return None
+        return await self._run("rehash", _hash_password, password, self.rounds)
+
+    async def calibrate(self, target_seconds: float, min_rounds: int) -> int:
+        """
+        Set "rounds" to the highest cost whose hash takes at most "target_seconds"
+        on this machine, but not below "min_rounds". A cheap cost is timed and
+        scaled up, every extra round doubles the time.
+
+        :return: the chosen cost
+        """
+        loop = asyncio.get_running_loop()
+        timings = []
+        for _ in range(3):
+            _, elapsed = await loop.run_in_executor(
+                self._executor, _timed, _hash_password, "x", CALIBRATION_ROUNDS
+            )
+            timings.append(elapsed)
+        doublings = math.log2(target_seconds / statistics.median(timings))
+        rounds = CALIBRATION_ROUNDS + math.floor(doublings)
+        self.rounds = min(max(rounds, min_rounds), MAX_ROUNDS)
+        password_hash_rounds.set(self.rounds)
+        return self.rounds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    auth_config.PASSWORD_HASH_WORKERS,
+    auth_config.PASSWORD_HASH_MAX_PENDING,
+    auth_config.BCRYPT_ROUNDS,
+)
@@ -0,0 +1,245 @@
+### IMPORTS ###
+# External Libraries
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, NamedTuple
+
+# Internal Libraries
+from app.config import cache_config
+from app.metrics import MetricFamily, Sample, registry
+
+
+### CODE ###
+
+
+class LRUCache:
+    """
+    Bounded in-process cache, the least recently used entry is evicted when it is full.
+    Entries can have an absolute expiry time (Unix Timestamp in seconds).
+
+    It is not thread safe, it is meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int):
+        # maxsize=0 disables the cache, every "get" is a miss
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class CacheBackend(ABC):
+    """
+    Storage of the "ResultCache", values are bytes so a networked store can hold them.
+    A Redis backend maps these to GET, SET with EX and INCR, anything that passes
+    for it (e.g. "FakeCacheBackend" of "tests/conftest.py") can be plugged in.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float): ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """
+        Atomically add one to the integer stored at "key" (0 when missing),
+        it must not expire.
+
+        :return: the new value
+        """
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per worker LRU, invalidations only reach the worker that made them,
+    so other workers can serve stale results for up to the TTL.
+    """
+
+    def __init__(self, maxsize: int):
+        self._entries = LRUCache(maxsize)
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        # Counters read back like Redis returns them, as the digits of the number
+        if key in self._counters:
+            return str(self._counters[key]).encode()
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries.set(key, value, expires_at=time.time() + ttl)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class CacheKey(NamedTuple):
+    """
+    Key of a "ResultCache" entry with the version of its namespace at lookup time.
+    """
+
+    namespace: str
+    version: int
+    key: str
+
+    def __str__(self) -> str:
+        return f"{self.namespace}:{self.version}:{self.key}"
+
+
+class ResultCache:
+    """
+    Read-through cache of rendered JSON responses with their ETags.
+
+    Keys live in namespaces (e.g. "foxes") and every namespace has a version number
+    that is part of the key, "invalidate" bumps it so all the entries of the
+    namespace are missed at once and age out of the backend on their own.
+
+    The version is read once by "key", before the database is, and the same key is
+    given to "set": a response read before an "invalidate" lands under the old
+    version, where nobody looks for it anymore.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Last version seen of every namespace and the "time.monotonic()" it was
+        # first seen at by this worker
+        self._versions: dict[str, int] = {}
+        self._changed_at: dict[str, float] = {}
+
+    def _seen(self, namespace: str, version: int):
+        if self._versions.get(namespace, version) != version:
+            self._changed_at[namespace] = time.monotonic()
+        self._versions[namespace] = version
+
+    async def key(self, namespace: str, key: str) -> CacheKey:
+        version = int(await self.backend.get(f"{namespace}:version") or 0)
+        self._seen(namespace, version)
+        return CacheKey(namespace, version, key)
+
+    def changed_within(self, namespace: str, seconds: float) -> bool:
+        """
+        :return: True if this worker saw "namespace" invalidated, by itself or
+            by another worker sharing the backend, in the last "seconds"
+        """
+        changed_at = self._changed_at.get(namespace)
+        return changed_at is not None and time.monotonic() - changed_at < seconds
+
+    async def get(self, cache_key: CacheKey) -> CachedResponse | None:
+        value = await self.backend.get(str(cache_key))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        etag, _, body = value.partition(b"\n")
+        return CachedResponse(etag.decode(), body)
+
+    async def set(self, cache_key: CacheKey, etag: str, body: bytes):
+        await self.backend.set(str(cache_key), etag.encode() + b"\n" + body, self.ttl)
+
+    async def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            version = await self.backend.incr(f"{namespace}:version")
+            self._versions[namespace] = version
+            self._changed_at[namespace] = time.monotonic()
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Swap the backend at startup to share the cache between workers
+result_cache = ResultCache(
+    MemoryCacheBackend(cache_config.RESULT_CACHE_SIZE), cache_config.RESULT_CACHE_TTL
+)
+
+# Caches exposed on "/metrics" by the value of their "cache" label,
+# add the ones created elsewhere (e.g. the JWT cache) where they are created
+monitored_caches: dict[str, LRUCache | ResultCache] = {"result": result_cache}
+
+
+def _cache_metrics() -> Iterable[MetricFamily]:
+    caches = monitored_caches.items()
+    yield MetricFamily(
+        "cache_hits_total",
+        "counter",
+        "Lookups that found a live entry",
+        ("cache",),
+        [Sample((name,), cache.hits) for name, cache in caches],
+    )
+    yield MetricFamily(
+        "cache_misses_total",
+        "counter",
+        "Lookups that found nothing or an expired entry",
+        ("cache",),
+        [Sample((name,), cache.misses) for name, cache in caches],
+    )
+    yield MetricFamily(
+        "cache_entries",
+        "gauge",
+        "Entries held, expired ones included until they are evicted",
+        ("cache",),
+        [
+            Sample((name,), len(cache))
+            for name, cache in caches
+            if isinstance(cache, LRUCache)
+        ],
+    )
+
+
+registry.add_collector(_cache_metrics)
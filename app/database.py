@@ -1,16 +1,28 @@
 ### IMPORTS ###
 
 # External Libraries
-from sqlalchemy.ext.asyncio.engine import create_async_engine
+import asyncio
+import itertools
+import logging
+import time
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.expression import select
+from sqlalchemy.ext.asyncio.engine import AsyncEngine, create_async_engine
 from sqlalchemy.ext.asyncio.session import async_sessionmaker, AsyncSession
-from sqlalchemy.engine.url import URL
-from collections.abc import AsyncGenerator
+from sqlalchemy.engine.url import URL, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from collections.abc import AsyncGenerator, Awaitable, Callable, Iterable, Sequence
 
 # Internal Libraries
 from app.config import database_config as db_config
+from app.metrics import MetricFamily, Sample, registry
+from app.sql_timing import instrument_engine
 
 ### CODE ###
 
+logger = logging.getLogger("app.database")
+
 # Database URL, based on the configuration
 url = URL(
     drivername=db_config.DB_DRIVERNAME,
@@ -24,8 +36,39 @@ url = URL(
     query={},
 )
 
+pool_wait = registry.histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool, it includes connecting",
+    ("engine",),
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    The default pool of the async engines, timing every checkout for "pool_wait",
+    the "engine" label is the "pool_logging_name" given to "create_async_engine".
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - started, (self.logging_name,))
+
+
 # connect_args={"sslmode": "require"}, this argument is also not working
-engine = create_async_engine(url=url, echo=True)
+# Pool sizing, timeouts and SQL echo come from "DB_PRESET" and the "DB_*" settings
+# The engines stay module level, migrations, benchmarks and the revocation list
+# import them. Creating one opens no connection, "warm_up" connects them in the
+# lifespan of each worker and "dispose" closes them on shutdown
+engine = create_async_engine(
+    url=url,
+    poolclass=InstrumentedPool,
+    pool_logging_name="primary",
+    **db_config.engine_options(),
+)
+instrument_engine(engine)
 
 AsyncSessionFactory = async_sessionmaker(
     bind=engine, expire_on_commit=False, autoflush=False
@@ -43,3 +86,266 @@ async def get_session() -> AsyncGenerator[AsyncSession]:
     # Creates a session and takes care of closing it when the context manager is done
     async with AsyncSessionFactory() as session:
         yield session
+
+
+class ReplicaRouter:
+    """
+    Hands out the replica engines round robin. A replica that fails to connect or
+    drops its connection is skipped for "retry_after" seconds, when all of them
+    are skipped reads go to the primary. "keep_checked" finds the replicas that
+    died or came back between requests, so requests don't have to.
+    """
+
+    def __init__(self, engines: list[AsyncEngine], retry_after: float):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._unhealthy_until: dict[AsyncEngine, float] = {}
+        self._counter = itertools.count()
+
+    def mark_unhealthy(self, replica_engine: AsyncEngine):
+        self._unhealthy_until[replica_engine] = time.monotonic() + self.retry_after
+
+    def mark_healthy(self, replica_engine: AsyncEngine):
+        self._unhealthy_until.pop(replica_engine, None)
+
+    def next_engine(self) -> AsyncEngine | None:
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            replica_engine = self.engines[next(self._counter) % len(self.engines)]
+            if self._unhealthy_until.get(replica_engine, 0) <= now:
+                return replica_engine
+        return None
+
+    async def _check(self, replica_engine: AsyncEngine):
+        try:
+            async with replica_engine.connect() as connection:
+                await connection.execute(select(1))
+        except (OSError, DBAPIError) as error:
+            if replica_engine not in self._unhealthy_until:
+                logger.warning(
+                    "Replica %s is unreachable: %s",
+                    replica_engine.pool.logging_name,
+                    error,
+                )
+            self.mark_unhealthy(replica_engine)
+        else:
+            self.mark_healthy(replica_engine)
+
+    async def check(self):
+        """
+        Run "SELECT 1" on every replica, marking the ones that fail unhealthy and
+        the ones that answer healthy again.
+        """
+        await asyncio.gather(*map(self._check, self.engines))
+
+    async def keep_checked(self, interval: float):
+        """
+        Runs until cancelled, "check" every "interval" seconds.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            await self.check()
+
+
+replica_router = ReplicaRouter(
+    [
+        create_async_engine(
+            url=make_url(replica_url),
+            poolclass=InstrumentedPool,
+            pool_logging_name=f"replica{index}",
+            **db_config.engine_options(),
+        )
+        for index, replica_url in enumerate(db_config.DB_REPLICA_URLS)
+    ],
+    db_config.DB_REPLICA_RETRY_AFTER,
+)
+for replica_engine in replica_router.engines:
+    instrument_engine(replica_engine)
+
+
+def _pool_metrics() -> Iterable[MetricFamily]:
+    pools = [engine.pool, *(replica.pool for replica in replica_router.engines)]
+    for name, help, read in [
+        ("db_pool_size", "Connections the pool keeps open", lambda pool: pool.size()),
+        (
+            "db_pool_checked_out",
+            "Connections in use by a session",
+            lambda pool: pool.checkedout(),
+        ),
+        # "overflow()" is negative while the pool has not opened "size()" connections
+        (
+            "db_pool_overflow",
+            "Connections open above the pool size",
+            lambda pool: max(pool.overflow(), 0),
+        ),
+    ]:
+        yield MetricFamily(
+            name,
+            "gauge",
+            help,
+            ("engine",),
+            [Sample((pool.logging_name,), read(pool)) for pool in pools],
+        )
+
+
+registry.add_collector(_pool_metrics)
+
+
+def _autocommit(async_engine: AsyncEngine) -> AsyncEngine:
+    # Same pool, but connections are handed out in autocommit mode, asyncpg then
+    # sends no BEGIN before the first query and no ROLLBACK when they are returned
+    return async_engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+# Reads run every statement in its own implicit transaction, so a request doing
+# two queries may see a write between them, the GET routes only compare row
+# versions, which stay safe. Streams with "yield_per" need a real transaction for
+# their server side cursor and keep using "AsyncSessionFactory"
+ReadSessionFactory = async_sessionmaker(
+    bind=_autocommit(engine), expire_on_commit=False, autoflush=False
+)
+_autocommit_replicas = {
+    replica_engine: _autocommit(replica_engine)
+    for replica_engine in replica_router.engines
+}
+
+# Clients send this header (any value) on the reads that have to see their own
+# writes, e.g. right after a POST, replicas may not have caught up yet
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+
+def _replica_of(session: AsyncSession) -> AsyncEngine | None:
+    for replica_engine, autocommit_engine in _autocommit_replicas.items():
+        if session.bind is replica_engine or session.bind is autocommit_engine:
+            return replica_engine
+    return None
+
+
+def reads_from_replica(session: AsyncSession) -> bool:
+    return _replica_of(session) is not None
+
+
+def _is_connection_error(error: Exception) -> bool:
+    # asyncpg raises OSError when it can't connect, query errors on a live
+    # connection don't make the replica unhealthy
+    return isinstance(error, OSError) or (
+        isinstance(error, DBAPIError) and error.connection_invalidated
+    )
+
+
+def report_error(session: AsyncSession, error: Exception) -> bool:
+    """
+    Mark the replica of "session", if it is bound to one, unhealthy when "error"
+    means it could not be reached.
+
+    :return: True if it was marked, what "session" did can be retried elsewhere
+    """
+    replica_engine = _replica_of(session)
+    if replica_engine is None or not _is_connection_error(error):
+        return False
+    replica_router.mark_unhealthy(replica_engine)
+    logger.warning(
+        "Replica %s failed, skipped for %s seconds: %s",
+        replica_engine.pool.logging_name,
+        replica_router.retry_after,
+        error,
+    )
+    return True
+
+
+def open_read_session(
+    use_replica: bool = True, autocommit: bool = True
+) -> AsyncSession:
+    """
+    A session bound to the next healthy replica, or to the primary when there is
+    none. Like every session it only connects on its first statement, so cache
+    hits never check out a connection.
+
+    :param autocommit: False for a session that needs a real transaction, e.g. to
+        stream with "yield_per"
+    :return: the caller closes it
+    """
+    session_factory = ReadSessionFactory if autocommit else AsyncSessionFactory
+    replica_engine = replica_router.next_engine() if use_replica else None
+    if replica_engine is None:
+        return session_factory()
+    bind = _autocommit_replicas[replica_engine] if autocommit else replica_engine
+    return session_factory(bind=bind)
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession]:
+    """
+    Same as "get_session" but the session is bound to a read replica when there is a
+    healthy one and runs in autocommit mode, saving the BEGIN and ROLLBACK round
+    trips of a transaction. Only use it in routes that do not write, anything they
+    wrote would be committed right away.
+
+    A replica that dies between two "ReplicaRouter.check" fails the requests it
+    was serving, and is skipped from the first failure on.
+
+    :return: a session of type AsyncSession
+    """
+    use_replica = READ_YOUR_WRITES_HEADER not in request.headers
+    async with open_read_session(use_replica) as session:
+        try:
+            yield session
+        except (OSError, DBAPIError) as error:
+            report_error(session, error)
+            raise
+
+
+async def _warm_up_engine(
+    async_engine: AsyncEngine,
+    connections: int,
+    warmers: Sequence[Callable[[AsyncSession], Awaitable[None]]],
+):
+    # Held open together, otherwise the pool would hand out the same one every time,
+    # more than the pool size would be closed again when they are returned
+    count = min(connections, async_engine.pool.size())
+    opened = await asyncio.gather(
+        *(async_engine.connect().start() for _ in range(count)),
+        return_exceptions=True,
+    )
+    try:
+        for connection in opened:
+            if isinstance(connection, BaseException):
+                raise connection
+            async with ReadSessionFactory(bind=connection) as session:
+                for warmer in warmers:
+                    await warmer(session)
+    finally:
+        for connection in opened:
+            if not isinstance(connection, BaseException):
+                await connection.close()
+
+
+async def warm_up(warmers: Sequence[Callable[[AsyncSession], Awaitable[None]]]):
+    """
+    Open "DB_POOL_WARMUP" connections on the primary and every replica before the
+    first request and run "warmers" on each of them, they should run the hot
+    queries so asyncpg has them prepared. A database that can't be reached is
+    logged and skipped, the app still starts and connects on demand, a replica is
+    also marked unhealthy so the first reads go to the others or the primary.
+    """
+    engines = [(None, _autocommit(engine)), *_autocommit_replicas.items()]
+    for replica_engine, async_engine in engines:
+        try:
+            await _warm_up_engine(async_engine, db_config.DB_POOL_WARMUP, warmers)
+        except (OSError, DBAPIError) as error:
+            if replica_engine is not None:
+                replica_router.mark_unhealthy(replica_engine)
+            logger.warning(
+                "Could not warm up the %s pool: %s",
+                async_engine.pool.logging_name,
+                error,
+            )
+
+
+async def dispose():
+    """
+    Close every pooled connection, so Postgres does not keep the sessions of a
+    stopped worker around until they time out.
+    """
+    await engine.dispose()
+    for replica_engine in replica_router.engines:
+        await replica_engine.dispose()
@@ -0,0 +1,30 @@
+# LOCAL CONFIGS FOR THE EXAMPLE MODULE
+### IMPORTS ###
+# External Libraries
+
+# Internal Libraries
+from app.config import BaseConfig
+
+
+### CODE ###
+
+
+class ExampleConfig(BaseConfig):
+    # Most ids fetched by one request to the "/batch" routes, "?ids=" is part of
+    # the URL, which proxies limit to a few kilobytes, POST the longer lists
+    BATCH_QUERY_MAX_IDS: int = 100
+    BATCH_MAX_IDS: int = 1000
+    # Rows fetched per round trip from the server side cursor of the "/export" routes
+    EXPORT_YIELD_PER: int = 1000
+    # Most items accepted by one request to the "/bulk" routes
+    BULK_MAX_ITEMS: int = 5000
+    # Most fox/dog pairs accepted by one request to "/fox_jumped_over_dog/bulk"
+    LINK_BULK_MAX_ITEMS: int = 200_000
+    # Pairs written by one "INSERT ... ON CONFLICT DO NOTHING" statement
+    LINK_INSERT_CHUNK_SIZE: int = 10_000
+    # Results returned by "/search" when "limit" is not given, and the most allowed
+    SEARCH_LIMIT_DEFAULT: int = 20
+    SEARCH_LIMIT_MAX: int = 100
+
+
+example_config = ExampleConfig()
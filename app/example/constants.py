@@ -23,3 +23,27 @@ class Color(Enum):
     BLUE = "blue"
     BLACK = "black"
     WHITE = "white"
+
+
+# What a "/search" result is
+class SearchKind(Enum):
+    FOX = "fox"
+    DOG = "dog"
+
+
+# Relationships that can be loaded with "?include=" on the fox and dog routes
+class FoxInclude(Enum):
+    JUMPED_OVER = "jumped_over"
+
+
+class DogInclude(Enum):
+    JUMPED_OVER_BY = "jumped_over_by"
+
+
+class LinkRejection(Enum):
+    FOX_NOT_FOUND = "fox_not_found"
+    DOG_NOT_FOUND = "dog_not_found"
+    # The same pair was sent more than once in the request
+    DUPLICATE = "duplicate"
+    # The fox already jumped over the dog before this request
+    ALREADY_EXISTS = "already_exists"
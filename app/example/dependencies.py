@@ -0,0 +1,81 @@
+### IMPORTS ###
+# External Libraries
+from typing import Annotated, Any, Callable, List
+from fastapi import Query
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.sql.expression import Select
+
+# Internal Libraries
+from app.example import models
+from app.example.config import example_config
+from app.example.constants import Color, Type
+from app.example.exceptions import invalid_ids, too_many_ids
+
+
+### CODE ###
+
+
+class AnimalFilters:
+    """
+    Query parameters filtering the "/foxes" and "/dogs" lists in SQL, use it as a
+    dependency: "filters: AnimalFilters = Depends()". Every filter is optional and
+    they are combined with AND.
+    """
+
+    def __init__(
+        self,
+        type: Annotated[Type | None, Query()] = None,
+        color: Annotated[Color | None, Query()] = None,
+        min_age: Annotated[int | None, Query(ge=0)] = None,
+        max_age: Annotated[int | None, Query(ge=0)] = None,
+        name_prefix: Annotated[str | None, Query(min_length=1, max_length=100)] = None,
+    ):
+        self.type = type
+        self.color = color
+        self.min_age = min_age
+        self.max_age = max_age
+        self.name_prefix = name_prefix
+
+    def apply(self, statement: Select, model: type[models.Fox | models.Dog]) -> Select:
+        if self.type is not None:
+            statement = statement.where(model.type == self.type)
+        if self.color is not None:
+            statement = statement.where(model.color == self.color)
+        if self.min_age is not None and self.min_age == self.max_age:
+            # An equality reads "ix_*_age_id" in "id" order, a range cannot
+            statement = statement.where(model.age == self.min_age)
+        else:
+            if self.min_age is not None:
+                statement = statement.where(model.age >= self.min_age)
+            if self.max_age is not None:
+                statement = statement.where(model.age <= self.max_age)
+        if self.name_prefix is not None:
+            # "autoescape" keeps "%" and "_" in the prefix from acting as wildcards
+            statement = statement.where(
+                model.name.startswith(self.name_prefix, autoescape=True)
+            )
+        return statement
+
+    def cache_key(self) -> str:
+        return (
+            f"{self.type}:{self.color}:{self.min_age}:{self.max_age}:{self.name_prefix}"
+        )
+
+
+def comma_separated_ids(id_type: type) -> Callable[..., List[Any]]:
+    """
+    Dependency parsing "?ids=1,2,3" into a list of "id_type", at most
+    "BATCH_QUERY_MAX_IDS" of them.
+    """
+    adapter = TypeAdapter(List[id_type])
+
+    def parse_ids(ids: Annotated[str, Query(min_length=1)]) -> List[Any]:
+        values = ids.split(",")
+        if len(values) > example_config.BATCH_QUERY_MAX_IDS:
+            raise too_many_ids
+        try:
+            return adapter.validate_python(values)
+        except ValidationError:
+            raise invalid_ids
+
+    return parse_ids
@@ -0,0 +1,29 @@
+from fastapi.exceptions import HTTPException
+from fastapi import status
+
+
+fox_not_found = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND, detail="Fox not found"
+)
+
+
+dog_not_found = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND, detail="Dog not found"
+)
+
+
+example_not_found = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND, detail="Example not found"
+)
+
+
+invalid_ids = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+    detail="ids must be a comma separated list of valid ids",
+)
+
+
+too_many_ids = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+    detail="Too many ids, send them in the body of a POST to the same path",
+)
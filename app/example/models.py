@@ -1,11 +1,12 @@
 # External Libraries
 from sqlalchemy.orm import mapped_column, relationship, Mapped
-from sqlalchemy.schema import ForeignKey
+from sqlalchemy.schema import ForeignKey, Index
 from uuid import UUID, uuid4
 from datetime import datetime, time, timedelta, date, timezone
 import random
 from typing import List
 from sqlalchemy.sql.sqltypes import DATETIME_TIMEZONE
+from sqlalchemy.sql.functions import now
 
 
 # Internal Libraries
@@ -34,6 +35,47 @@ from app.example.constants import Type, Color
 # https://docs.sqlalchemy.org/en/20/faq/ormconfiguration.html#defaults-default-factory-insert-default
 
 
+def updated_at_column() -> Mapped[datetime]:
+    """
+    Row version, it is bumped on every ORM update and the ETags of the GET routes
+    are computed from it, so they don't have to serialize the rows to compare them.
+    "server_default" fills it in for rows inserted outside of the ORM.
+    """
+    return mapped_column(
+        DATETIME_TIMEZONE,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        server_default=now(),
+    )
+
+
+def filter_indexes(tablename: str) -> tuple[Index, ...]:
+    """
+    Indexes behind the filters of the "/foxes" and "/dogs" lists and "/search".
+    Pages are ordered by "id", so ending the indexes with it lets an equality filter
+    read its rows already in page order and stop after "limit" rows, instead of
+    sorting all the matches.
+    "varchar_pattern_ops" makes "name LIKE 'prefix%'" a range scan in any collation
+    and the "gin_trgm_ops" index of pg_trgm serves the "name % 'query'" of "/search".
+    """
+    return (
+        Index(f"ix_{tablename}_type_color_id", "type", "color", "id"),
+        Index(f"ix_{tablename}_color_id", "color", "id"),
+        Index(f"ix_{tablename}_age_id", "age", "id"),
+        Index(
+            f"ix_{tablename}_name_pattern",
+            "name",
+            postgresql_ops={"name": "varchar_pattern_ops"},
+        ),
+        Index(
+            f"ix_{tablename}_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
+
 class Example(Base):
     __tablename__ = "examples"
     uuid: Mapped[UUID] = mapped_column(primary_key=True, default=uuid4)
@@ -54,6 +96,11 @@ class Example(Base):
     timedelta_obj: Mapped[timedelta] = mapped_column(
         name="timedelta", default=lambda: timedelta(days=random.random())
     )
+    updated_at: Mapped[datetime] = updated_at_column()
+
+    # Keyset pagination of "/examples" orders by (datetime, uuid),
+    # this index turns every page into an index range scan
+    __table_args__ = (Index("ix_examples_datetime_uuid", "datetime", "uuid"),)
 
     def __repr__(self) -> str:
         return f"<Example uuid={self.uuid}>"
@@ -69,6 +116,7 @@ class Fox(Base):
     # and then use the random.choice function to get one of the enums from the list
     type: Mapped[Type] = mapped_column(default=lambda: random.choice(list(Type)))
     color: Mapped[Color] = mapped_column(default=lambda: random.choice(list(Color)))
+    updated_at: Mapped[datetime] = updated_at_column()
     # Useful link about 'secondary' parameter of relationship:
     # https://docs.sqlalchemy.org/en/20/orm/basic_relationships.html#using-a-late-evaluated-form-for-the-secondary-argument-of-many-to-many
     # It is for when we define the link/association table later than the models to be linked
@@ -85,6 +133,8 @@ class Fox(Base):
         passive_updates=True,
     )
 
+    __table_args__ = filter_indexes("foxes")
+
     def __str__(self) -> str:
         return f"The {self.type} {self.color} fox named {self.name}"
 
@@ -99,6 +149,7 @@ class Dog(Base):
     age: Mapped[int]
     type: Mapped[Type] = mapped_column(default=lambda: random.choice(list(Type)))
     color: Mapped[Color] = mapped_column(default=lambda: random.choice(list(Color)))
+    updated_at: Mapped[datetime] = updated_at_column()
     # 'passive_deletes=True' means that there is an ON DELETE CASCADE on the foreign key
     # so it no longer has to load the collection to mark the items as deleted in the
     # link/association table, database will take care of it
@@ -111,6 +162,8 @@ class Dog(Base):
         passive_updates=True,
     )
 
+    __table_args__ = filter_indexes("dogs")
+
     def __str__(self) -> str:
         return f"The {self.type} {self.color} fox named {self.name}"
 
@@ -123,7 +176,10 @@ class FoxDogLink(Base):
     fox_id: Mapped[int] = mapped_column(
         ForeignKey("foxes.id", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True
     )
+    # The composite primary key index starts with "fox_id", so it can't serve
+    # lookups by dog, "index=True" adds a separate one for "Dog.jumped_over_by"
     dog_id: Mapped[int] = mapped_column(
         ForeignKey("dogs.id", ondelete="CASCADE", onupdate="CASCADE"),
         primary_key=True,
+        index=True,
     )
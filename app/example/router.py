@@ -1,15 +1,32 @@
 ### IMPORTS ###
 # External Libraries
-from fastapi import APIRouter, Depends, status
-from typing import List
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from typing import Annotated, List
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlalchemy.sql.expression import select
 from uuid import UUID
 
 
 # Internal Libraries
-from app.example import schemas, models
-from app.database import get_session
+from app.example import schemas, models, service
+from app.example.config import example_config
+from app.example.dependencies import AnimalFilters, comma_separated_ids
+from app.example.constants import DogInclude, FoxInclude
+from app.example.exceptions import dog_not_found, example_not_found, fox_not_found
+from app.database import get_read_session, get_session
+from app.pagination import Page, PageParams, conditional_page, paginate
+from app.cache import result_cache
+from app.responses import (
+    NOT_MODIFIED_RESPONSE,
+    cache_response,
+    cached_response,
+    conditional_response,
+    dump_json,
+    make_etag,
+    to_json,
+)
+from app.streaming import NDJSON_MEDIA_TYPE, ndjson_response
 
 
 ### CODE ###
@@ -17,16 +34,136 @@ from app.database import get_session
 router = APIRouter()
 
 
-@router.get("/foxes", response_model=List[schemas.Fox], status_code=status.HTTP_200_OK)
-async def get_foxes(session: AsyncSession = Depends(get_session)):
-    query_res = await session.execute(statement=select(models.Fox))
-    return query_res.scalars().all()
+@router.get(
+    "/foxes",
+    response_model=Page[schemas.Fox],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def get_foxes(
+    request: Request,
+    include: Annotated[FoxInclude | None, Query()] = None,
+    filters: AnimalFilters = Depends(),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    cache_key = await result_cache.key(
+        "foxes", f"page:{include}:{filters.cache_key()}:{page.limit}:{page.cursor}"
+    )
+    response = await cached_response(request, cache_key)
+    if response is not None:
+        return response
+
+    keyset = [models.Fox.id]
+
+    if include is None:
+        statement = filters.apply(select(*service.fox_serializer.columns), models.Fox)
+        response = await conditional_page(
+            request,
+            session,
+            statement,
+            keyset,
+            page,
+            service.fox_serializer,
+            models.Fox.updated_at,
+        )
+    else:
+        # Adding or removing links does not bump "updated_at", so with included
+        # relationships the ETag is the hash of the body instead
+        statement = filters.apply(
+            select(models.Fox).options(*service.fox_load_options(include)), models.Fox
+        )
+        foxes = await paginate(session, statement, keyset, page)
+        response = conditional_response(
+            request, lambda: dump_json(Page[schemas.Fox], foxes)
+        )
+    await cache_response(cache_key, response, session)
+    return response
+
+
+# Has to be registered before "/foxes/{id}", otherwise "export" would be matched as an id
+@router.get(
+    "/foxes/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_foxes():
+    return await ndjson_response(
+        select(models.Fox).order_by(models.Fox.id),
+        schemas.Fox,
+        example_config.EXPORT_YIELD_PER,
+    )
+
+
+# Fetches many foxes with one query instead of one "/foxes/{id}" request each,
+# also registered before "/foxes/{id}"
+@router.get(
+    "/foxes/batch",
+    response_model=schemas.Batch[schemas.Fox, int],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def get_fox_batch(
+    request: Request,
+    ids: List[int] = Depends(comma_separated_ids(int)),
+    session: AsyncSession = Depends(get_read_session),
+):
+    batch = await service.get_batch(session, service.fox_serializer, models.Fox.id, ids)
+    return conditional_response(request, lambda: to_json(batch))
+
+
+@router.post(
+    "/foxes/batch",
+    response_model=schemas.Batch[schemas.Fox, int],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def post_fox_batch(
+    request: Request,
+    ids: schemas.IdBatch,
+    session: AsyncSession = Depends(get_read_session),
+):
+    batch = await service.get_batch(session, service.fox_serializer, models.Fox.id, ids)
+    return conditional_response(request, lambda: to_json(batch))
 
 
-@router.get("/foxes/{id}", response_model=schemas.Fox, status_code=status.HTTP_200_OK)
-async def get_fox(id: int, session: AsyncSession = Depends(get_session)):
-    fox = await session.get_one(models.Fox, id)
-    return fox
+@router.get(
+    "/foxes/{id}",
+    response_model=schemas.Fox,
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def get_fox(
+    request: Request,
+    id: int,
+    include: Annotated[FoxInclude | None, Query()] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    cache_key = await result_cache.key("foxes", f"id:{id}:{include}")
+    response = await cached_response(request, cache_key)
+    if response is not None:
+        return response
+
+    if include is None:
+        query_res = await session.execute(
+            service.select_row(service.fox_serializer, models.Fox.id, id)
+        )
+        row = query_res.one_or_none()
+        if row is None:
+            raise fox_not_found
+        fox = service.fox_serializer.item(row)
+        response = conditional_response(
+            request, lambda: to_json(fox), make_etag(id, row.updated_at)
+        )
+    else:
+        fox = await session.get(
+            models.Fox, id, options=service.fox_load_options(include)
+        )
+        if fox is None:
+            raise fox_not_found
+        response = conditional_response(request, lambda: dump_json(schemas.Fox, fox))
+    await cache_response(cache_key, response, session)
+    return response
 
 
 @router.post("/foxes", response_model=schemas.Fox, status_code=status.HTTP_201_CREATED)
@@ -42,6 +179,7 @@ async def create_fox(
     # await session.refresh(new_fox, attribute_names=["jumped_over"])
 
     await session.refresh(new_fox)
+    await result_cache.invalidate("foxes")
 
     # If you need to access the jumped_over attribute, you need to await it
     # like this, since it is an awaitable attribute.
@@ -50,32 +188,174 @@ async def create_fox(
     return new_fox
 
 
+@router.post(
+    "/foxes/bulk",
+    response_model=List[schemas.Fox],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_foxes(
+    foxes: schemas.FoxBulkCreate, session: AsyncSession = Depends(get_session)
+):
+    new_foxes = await service.bulk_insert(session, models.Fox, foxes)
+    await result_cache.invalidate("foxes")
+    return new_foxes
+
+
 @router.get(
     "/foxes/{id}/jumped_over",
     response_model=List[schemas.Dog],
     status_code=status.HTTP_200_OK,
 )
 async def get_dogs_jumped_over_by_fox(
-    id: int, session: AsyncSession = Depends(get_session)
+    id: int, session: AsyncSession = Depends(get_read_session)
+):
+    dogs = await service.get_dogs_jumped_over_by_fox(session, id)
+    if dogs is None:
+        raise fox_not_found
+    return dogs
+
+
+@router.get(
+    "/dogs",
+    response_model=Page[schemas.Dog],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def get_dogs(
+    request: Request,
+    include: Annotated[DogInclude | None, Query()] = None,
+    filters: AnimalFilters = Depends(),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    fox = await session.get_one(
-        models.Fox,
-        id,
+    cache_key = await result_cache.key(
+        "dogs", f"page:{include}:{filters.cache_key()}:{page.limit}:{page.cursor}"
     )
-    return await fox.awaitable_attrs.jumped_over
+    response = await cached_response(request, cache_key)
+    if response is not None:
+        return response
+
+    keyset = [models.Dog.id]
+
+    if include is None:
+        statement = filters.apply(select(*service.dog_serializer.columns), models.Dog)
+        response = await conditional_page(
+            request,
+            session,
+            statement,
+            keyset,
+            page,
+            service.dog_serializer,
+            models.Dog.updated_at,
+        )
+    else:
+        statement = filters.apply(
+            select(models.Dog).options(*service.dog_load_options(include)), models.Dog
+        )
+        dogs = await paginate(session, statement, keyset, page)
+        response = conditional_response(
+            request, lambda: dump_json(Page[schemas.Dog], dogs)
+        )
+    await cache_response(cache_key, response, session)
+    return response
 
 
-@router.get("/dogs", response_model=List[schemas.Dog], status_code=status.HTTP_200_OK)
-async def get_dogs(session: AsyncSession = Depends(get_session)):
-    query_res = await session.execute(select(models.Dog))
+@router.get(
+    "/dogs/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_dogs():
+    return await ndjson_response(
+        select(models.Dog).order_by(models.Dog.id),
+        schemas.Dog,
+        example_config.EXPORT_YIELD_PER,
+    )
 
-    return query_res.scalars().all()
 
+# Fetches many dogs with one query instead of one "/dogs/{id}" request each,
+# also registered before "/dogs/{id}"
+@router.get(
+    "/dogs/batch",
+    response_model=schemas.Batch[schemas.Dog, int],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def get_dog_batch(
+    request: Request,
+    ids: List[int] = Depends(comma_separated_ids(int)),
+    session: AsyncSession = Depends(get_read_session),
+):
+    batch = await service.get_batch(session, service.dog_serializer, models.Dog.id, ids)
+    return conditional_response(request, lambda: to_json(batch))
 
-@router.get("/dogs/{id}", response_model=schemas.Dog, status_code=status.HTTP_200_OK)
-async def get_dog(id: int, session: AsyncSession = Depends(get_session)):
-    dog = await session.get_one(models.Dog, id)
-    return dog
+
+@router.post(
+    "/dogs/batch",
+    response_model=schemas.Batch[schemas.Dog, int],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def post_dog_batch(
+    request: Request,
+    ids: schemas.IdBatch,
+    session: AsyncSession = Depends(get_read_session),
+):
+    batch = await service.get_batch(session, service.dog_serializer, models.Dog.id, ids)
+    return conditional_response(request, lambda: to_json(batch))
+
+
+@router.get(
+    "/dogs/{id}",
+    response_model=schemas.Dog,
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def get_dog(
+    request: Request,
+    id: int,
+    include: Annotated[DogInclude | None, Query()] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    cache_key = await result_cache.key("dogs", f"id:{id}:{include}")
+    response = await cached_response(request, cache_key)
+    if response is not None:
+        return response
+
+    if include is None:
+        query_res = await session.execute(
+            service.select_row(service.dog_serializer, models.Dog.id, id)
+        )
+        row = query_res.one_or_none()
+        if row is None:
+            raise dog_not_found
+        dog = service.dog_serializer.item(row)
+        response = conditional_response(
+            request, lambda: to_json(dog), make_etag(id, row.updated_at)
+        )
+    else:
+        dog = await session.get(
+            models.Dog, id, options=service.dog_load_options(include)
+        )
+        if dog is None:
+            raise dog_not_found
+        response = conditional_response(request, lambda: dump_json(schemas.Dog, dog))
+    await cache_response(cache_key, response, session)
+    return response
+
+
+@router.get(
+    "/dogs/{id}/jumped_over_by",
+    response_model=List[schemas.Fox],
+    status_code=status.HTTP_200_OK,
+)
+async def get_foxes_that_jumped_over_dog(
+    id: int, session: AsyncSession = Depends(get_read_session)
+):
+    foxes = await service.get_foxes_that_jumped_over_dog(session, id)
+    if foxes is None:
+        raise dog_not_found
+    return foxes
 
 
 @router.post("/dogs", response_model=schemas.Dog, status_code=status.HTTP_201_CREATED)
@@ -86,10 +366,22 @@ async def create_dog(
     session.add(new_dog)
     await session.commit()
     await session.refresh(new_dog)
+    await result_cache.invalidate("dogs")
 
     return new_dog
 
 
+@router.post(
+    "/dogs/bulk", response_model=List[schemas.Dog], status_code=status.HTTP_201_CREATED
+)
+async def create_dogs(
+    dogs: schemas.DogBulkCreate, session: AsyncSession = Depends(get_session)
+):
+    new_dogs = await service.bulk_insert(session, models.Dog, dogs)
+    await result_cache.invalidate("dogs")
+    return new_dogs
+
+
 @router.post("/fox_jumped_over_dog", status_code=status.HTTP_201_CREATED)
 async def create_fox_dog_link(
     fox_dog_link: schemas.FoxDogLink, session: AsyncSession = Depends(get_session)
@@ -101,22 +393,152 @@ async def create_fox_dog_link(
     new_fox_dog_link = models.FoxDogLink(**fox_dog_link.model_dump())
     session.add(new_fox_dog_link)
     await session.commit()
+    # Foxes and dogs rendered with "?include=" show the new link
+    await result_cache.invalidate("foxes", "dogs")
+
+
+@router.post(
+    "/fox_jumped_over_dog/bulk",
+    response_model=schemas.FoxDogLinkBulkResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_fox_dog_links(
+    fox_dog_links: schemas.FoxDogLinkBulkCreate,
+    session: AsyncSession = Depends(get_session),
+):
+    result = await service.bulk_link_foxes_to_dogs(
+        session, fox_dog_links, example_config.LINK_INSERT_CHUNK_SIZE
+    )
+    await result_cache.invalidate("foxes", "dogs")
+    return result
+
+
+@router.get(
+    "/search",
+    response_model=List[schemas.SearchResult],
+    status_code=status.HTTP_200_OK,
+)
+async def search(
+    # Fewer than 3 characters have too few trigrams to tell names apart
+    q: Annotated[str, Query(min_length=3, max_length=100)],
+    limit: Annotated[
+        int, Query(ge=1, le=example_config.SEARCH_LIMIT_MAX)
+    ] = example_config.SEARCH_LIMIT_DEFAULT,
+    session: AsyncSession = Depends(get_read_session),
+):
+    return await service.search_names(session, q, limit)
+
+
+@router.get(
+    "/examples",
+    response_model=Page[schemas.Example],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def get_examples(
+    request: Request,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    cache_key = await result_cache.key("examples", f"page:{page.limit}:{page.cursor}")
+    response = await cached_response(request, cache_key)
+    if response is not None:
+        return response
+
+    statement = select(*service.example_serializer.columns)
+    # "uuid" breaks ties between examples created at the same moment
+    keyset = [models.Example.datetime_obj, models.Example.uuid]
+
+    response = await conditional_page(
+        request,
+        session,
+        statement,
+        keyset,
+        page,
+        service.example_serializer,
+        models.Example.updated_at,
+    )
+    await cache_response(cache_key, response, session)
+    return response
 
 
 @router.get(
-    "/examples", response_model=List[schemas.Example], status_code=status.HTTP_200_OK
+    "/examples/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
 )
-async def get_examples(session: AsyncSession = Depends(get_session)):
-    query_res = await session.execute(select(models.Example))
-    return query_res.scalars().all()
+async def export_examples():
+    return await ndjson_response(
+        select(models.Example).order_by(
+            models.Example.datetime_obj, models.Example.uuid
+        ),
+        schemas.Example,
+        example_config.EXPORT_YIELD_PER,
+    )
 
 
+# Fetches many examples with one query instead of one "/examples/{id}" request each,
+# also registered before "/examples/{id}"
 @router.get(
-    "/examples/{id}", response_model=schemas.Example, status_code=status.HTTP_200_OK
+    "/examples/batch",
+    response_model=schemas.Batch[schemas.Example, UUID],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
 )
-async def get_example(id: UUID, session: AsyncSession = Depends(get_session)):
-    example = await session.get_one(models.Example, id)
-    return example
+async def get_example_batch(
+    request: Request,
+    ids: List[UUID] = Depends(comma_separated_ids(UUID)),
+    session: AsyncSession = Depends(get_read_session),
+):
+    batch = await service.get_batch(
+        session, service.example_serializer, models.Example.uuid, ids
+    )
+    return conditional_response(request, lambda: to_json(batch))
+
+
+@router.post(
+    "/examples/batch",
+    response_model=schemas.Batch[schemas.Example, UUID],
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def post_example_batch(
+    request: Request,
+    ids: schemas.UUIDBatch,
+    session: AsyncSession = Depends(get_read_session),
+):
+    batch = await service.get_batch(
+        session, service.example_serializer, models.Example.uuid, ids
+    )
+    return conditional_response(request, lambda: to_json(batch))
+
+
+@router.get(
+    "/examples/{id}",
+    response_model=schemas.Example,
+    status_code=status.HTTP_200_OK,
+    responses=NOT_MODIFIED_RESPONSE,
+)
+async def get_example(
+    request: Request, id: UUID, session: AsyncSession = Depends(get_read_session)
+):
+    cache_key = await result_cache.key("examples", f"id:{id}")
+    response = await cached_response(request, cache_key)
+    if response is not None:
+        return response
+
+    query_res = await session.execute(
+        service.select_row(service.example_serializer, models.Example.uuid, id)
+    )
+    row = query_res.one_or_none()
+    if row is None:
+        raise example_not_found
+    example = service.example_serializer.item(row)
+    response = conditional_response(
+        request, lambda: to_json(example), make_etag(id, row.updated_at)
+    )
+    await cache_response(cache_key, response, session)
+    return response
 
 
 @router.post(
@@ -129,5 +551,19 @@ async def create_example(
     session.add(new_example)
     await session.commit()
     await session.refresh(new_example)
+    await result_cache.invalidate("examples")
 
     return new_example
+
+
+@router.post(
+    "/examples/bulk",
+    response_model=List[schemas.Example],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_examples(
+    examples: schemas.ExampleBulkCreate, session: AsyncSession = Depends(get_session)
+):
+    new_examples = await service.bulk_insert(session, models.Example, examples)
+    await result_cache.invalidate("examples")
+    return new_examples
@@ -1,16 +1,42 @@
 ### IMPORTS ###
 # External Libraries
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from sqlalchemy import inspect
+from sqlalchemy.orm import InstanceState
+from typing import Annotated, Any, Generic, List, TypeVar
 from uuid import UUID
 from datetime import datetime, time, date, timedelta
 
 
 # Internal Libraries
-from app.example.constants import Type, Color
+from app.example.constants import Type, Color, LinkRejection, SearchKind
+from app.example.config import example_config
 
 
 ### CODE ###
 
+T = TypeVar("T")
+K = TypeVar("K")
+
+
+def skip_unloaded_relationships(data: Any) -> Any:
+    """
+    Reading a relationship that was not loaded (e.g. with "selectinload") on an async
+    session raises a greenlet error, so when an ORM object has unloaded relationships
+    they are left out and the schema falls back to the field default instead.
+    """
+    state = inspect(data, raiseerr=False)
+    if not isinstance(state, InstanceState):
+        return data
+    unloaded = state.unloaded.intersection(state.mapper.relationships.keys())
+    if not unloaded:
+        return data
+    return {
+        key: getattr(data, key)
+        for key in state.mapper.attrs.keys()
+        if key not in unloaded
+    }
+
 
 class FoxBase(BaseModel):
     name: str
@@ -24,18 +50,26 @@ class FoxCreate(FoxBase):
     color: Color | None = None
 
 
+FoxBulkCreate = Annotated[
+    List[FoxCreate], Field(min_length=1, max_length=example_config.BULK_MAX_ITEMS)
+]
+
+
 class Fox(FoxBase):
     id: int
     type: Type
     color: Color
-    ## This field throws a greenlet error when returning a models.Fox instance
-    ## whose awaitable attribute/lazy-loaded attribute has not been explicitly awaited/loaded
-    ## so I removed it from the pydantic model
-    # jumped_over: List["Dog"] | None = None
+    # Only filled in with "?include=jumped_over", reading it when it was not loaded
+    # throws a greenlet error, so "skip_unloaded_relationships" leaves it as None
+    jumped_over: List["Dog"] | None = None
 
     # "orm_mode" has been renamed to "from_attributes" in V2 of Pydantic
     model_config = ConfigDict(from_attributes=True)
 
+    _skip_unloaded_relationships = model_validator(mode="before")(
+        skip_unloaded_relationships
+    )
+
 
 class DogBase(BaseModel):
     name: str
@@ -47,20 +81,72 @@ class DogCreate(DogBase):
     color: Color | None = None
 
 
+DogBulkCreate = Annotated[
+    List[DogCreate], Field(min_length=1, max_length=example_config.BULK_MAX_ITEMS)
+]
+
+
 class Dog(DogBase):
     id: int
     type: Type
     color: Color
-    # jumped_over_by: List["Fox"] | None = None
+    # Only filled in with "?include=jumped_over_by"
+    jumped_over_by: List["Fox"] | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
+    _skip_unloaded_relationships = model_validator(mode="before")(
+        skip_unloaded_relationships
+    )
+
+
+# "Fox" refers to "Dog" before it is defined
+Fox.model_rebuild()
+
 
 class FoxDogLink(BaseModel):
     fox_id: int
     dog_id: int
 
 
+FoxDogLinkBulkCreate = Annotated[
+    List[FoxDogLink],
+    Field(min_length=1, max_length=example_config.LINK_BULK_MAX_ITEMS),
+]
+
+
+class RejectedFoxDogLink(FoxDogLink):
+    reason: LinkRejection
+
+
+class FoxDogLinkBulkResult(BaseModel):
+    inserted: int
+    rejected: List[RejectedFoxDogLink]
+
+
+class Batch(BaseModel, Generic[T, K]):
+    # One entry per requested id, in the same order, None where the id does not exist
+    items: List[T | None]
+    # The requested ids that do not exist, once each
+    missing: List[K]
+
+
+IdBatch = Annotated[
+    List[int], Field(min_length=1, max_length=example_config.BATCH_MAX_IDS)
+]
+UUIDBatch = Annotated[
+    List[UUID], Field(min_length=1, max_length=example_config.BATCH_MAX_IDS)
+]
+
+
+class SearchResult(BaseModel):
+    kind: SearchKind
+    id: int
+    name: str
+    # pg_trgm similarity of "name" to the query, from 0 to 1
+    score: float
+
+
 class ExampleBase(BaseModel):
     string: str
 
@@ -74,6 +160,12 @@ class ExampleCreate(ExampleBase):
     timedelta_obj: timedelta | None = None
 
 
+ExampleBulkCreate = Annotated[
+    List[ExampleCreate],
+    Field(min_length=1, max_length=example_config.BULK_MAX_ITEMS),
+]
+
+
 class Example(ExampleBase):
     uuid: UUID
     integer: int
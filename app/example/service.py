@@ -0,0 +1,341 @@
+### IMPORTS ###
+# External Libraries
+from typing import Any, Sequence
+from uuid import UUID
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, selectinload
+from sqlalchemy.schema import ColumnDefault
+from sqlalchemy.sql.expression import (
+    Select,
+    any_,
+    bindparam,
+    func,
+    insert,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.sql.sqltypes import Integer
+
+# Internal Libraries
+from app.config import pagination_config
+from app.models import Base
+from app.pagination import (
+    PageParams,
+    page_version,
+    paginate_rows,
+    paginate_rows_versioned,
+)
+from app.responses import RowSerializer
+from app.example import models, schemas
+from app.example.constants import DogInclude, FoxInclude, LinkRejection, SearchKind
+
+
+### CODE ###
+
+# Used by the GET routes when there is nothing to "?include="
+fox_serializer = RowSerializer(schemas.Fox, models.Fox)
+dog_serializer = RowSerializer(schemas.Dog, models.Dog)
+example_serializer = RowSerializer(schemas.Example, models.Example)
+
+
+def select_row(
+    serializer: RowSerializer, key: InstrumentedAttribute, value: Any
+) -> Select:
+    """
+    The columns of "serializer" and "updated_at", for the ETag, of the row
+    where "key" is "value".
+    """
+    return select(*serializer.columns, key.class_.updated_at).where(key == value)
+
+
+def fox_load_options(include: FoxInclude | None) -> list:
+    # "selectinload" loads the dogs of all the selected foxes with one extra
+    # "WHERE fox_id IN (...)" query, instead of one lazy load per fox
+    if include is FoxInclude.JUMPED_OVER:
+        return [selectinload(models.Fox.jumped_over)]
+    return []
+
+
+def dog_load_options(include: DogInclude | None) -> list:
+    if include is DogInclude.JUMPED_OVER_BY:
+        return [selectinload(models.Dog.jumped_over_by)]
+    return []
+
+
+async def get_batch(
+    session: AsyncSession,
+    serializer: RowSerializer,
+    key: InstrumentedAttribute,
+    ids: Sequence[Any],
+) -> dict[str, list]:
+    """
+    The rows of "ids" with one "WHERE key = ANY(:ids)" query, the whole list is one
+    array parameter however long it is.
+
+    :return: a "schemas.Batch", "items" in the order of "ids" with None for the ids
+        that do not exist, which are listed once each in "missing"
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    query_res = await session.execute(
+        select(*serializer.columns, key).where(
+            key == any_(bindparam("ids", unique_ids, type_=ARRAY(key.type)))
+        )
+    )
+    found = {row[-1]: serializer.item(row) for row in query_res}
+    return {
+        "items": [found.get(id) for id in ids],
+        "missing": [id for id in unique_ids if id not in found],
+    }
+
+
+async def get_dogs_jumped_over_by_fox(
+    session: AsyncSession, fox_id: int
+) -> Sequence[models.Dog] | None:
+    """
+    One LEFT JOIN query, the fox row is always there when the fox exists, even if it
+    did not jump over any dog, so a missing fox and an empty list can be told apart.
+
+    :return: None if the fox does not exist
+    """
+    query_res = await session.execute(
+        select(models.Fox.id, models.Dog)
+        .outerjoin(models.FoxDogLink, models.FoxDogLink.fox_id == models.Fox.id)
+        .outerjoin(models.Dog, models.Dog.id == models.FoxDogLink.dog_id)
+        .where(models.Fox.id == fox_id)
+        .order_by(models.Dog.id)
+    )
+    rows = query_res.all()
+    if not rows:
+        return None
+    return [dog for _, dog in rows if dog is not None]
+
+
+async def get_foxes_that_jumped_over_dog(
+    session: AsyncSession, dog_id: int
+) -> Sequence[models.Fox] | None:
+    """
+    Same as "get_dogs_jumped_over_by_fox" from the dog side, the join uses the
+    "fox_dog_links.dog_id" index.
+
+    :return: None if the dog does not exist
+    """
+    query_res = await session.execute(
+        select(models.Dog.id, models.Fox)
+        .outerjoin(models.FoxDogLink, models.FoxDogLink.dog_id == models.Dog.id)
+        .outerjoin(models.Fox, models.Fox.id == models.FoxDogLink.fox_id)
+        .where(models.Dog.id == dog_id)
+        .order_by(models.Fox.id)
+    )
+    rows = query_res.all()
+    if not rows:
+        return None
+    return [fox for _, fox in rows if fox is not None]
+
+
+def _search_table(
+    model: type[models.Fox | models.Dog], kind: SearchKind, q: str, limit: int
+) -> Select:
+    score = func.similarity(model.name, q)
+    return (
+        select(
+            literal(kind.value).label("kind"),
+            model.id,
+            model.name,
+            score.label("score"),
+        )
+        # "%" is "similarity() above pg_trgm.similarity_threshold" (0.3 by default),
+        # unlike a bare "similarity() > x" it can be answered by the trigram index
+        .where(model.name.op("%")(q))
+        .order_by(score.desc(), model.id)
+        .limit(limit)
+    )
+
+
+def search_statement(q: str, limit: int) -> Select:
+    """
+    Foxes and dogs whose name looks like "q", the most similar first. Each table
+    picks its best "limit" matches through its "ix_*_name_trgm" GIN index, so only
+    those are sorted, then the two lists are merged.
+    """
+    matches = union_all(
+        _search_table(models.Fox, SearchKind.FOX, q, limit),
+        _search_table(models.Dog, SearchKind.DOG, q, limit),
+    ).subquery()
+    return (
+        select(matches)
+        .order_by(matches.c.score.desc(), matches.c.kind, matches.c.id)
+        .limit(limit)
+    )
+
+
+async def search_names(
+    session: AsyncSession, q: str, limit: int
+) -> Sequence[dict[str, Any]]:
+    query_res = await session.execute(search_statement(q, limit))
+    return query_res.mappings().all()
+
+
+def _python_defaults(model: type[Base]) -> list[tuple[str, ColumnDefault]]:
+    """
+    The attributes of "model" whose column has a Python side "default".
+    """
+    return [
+        (attr.key, attr.columns[0].default)
+        for attr in inspect(model).column_attrs
+        if isinstance(attr.columns[0].default, ColumnDefault)
+    ]
+
+
+async def bulk_insert(
+    session: AsyncSession, model: type[Base], items: Sequence[BaseModel]
+) -> Sequence[Base]:
+    """
+    Insert all "items" with one multi-row "INSERT ... RETURNING" in one transaction.
+
+    asyncpg sends it as "insertmanyvalues" batches, so thousands of rows cost a few
+    round trips instead of the add/commit/refresh round trips per row of the single
+    create routes. Python side defaults of the model (e.g. the random fox "type")
+    are still applied to the rows that leave them out.
+
+    :return: the created rows, in the same order as "items"
+    """
+    statement = insert(model).returning(model, sort_by_parameter_order=True)
+    defaults = _python_defaults(model)
+    rows = []
+    for item in items:
+        # "exclude_none" leaves unset optional fields to the column defaults,
+        # the same way "session.add" skips None attributes
+        row = item.model_dump(exclude_none=True)
+        # Only consecutive rows with the same keys are batched into one
+        # statement, so every row gets a value for every defaulted column
+        for key, default in defaults:
+            if key not in row:
+                row[key] = default.arg(None) if default.is_callable else default.arg
+        rows.append(row)
+    query_res = await session.scalars(statement, rows)
+    rows = query_res.all()
+    await session.commit()
+    return rows
+
+
+# Whole id sets are sent as one array parameter, "IN (...)" would need one bind
+# parameter per id and asyncpg allows at most 32767 of them per statement
+_existing_ids = union_all(
+    select(literal("fox"), models.Fox.id).where(
+        models.Fox.id == any_(bindparam("fox_ids", type_=ARRAY(Integer)))
+    ),
+    select(literal("dog"), models.Dog.id).where(
+        models.Dog.id == any_(bindparam("dog_ids", type_=ARRAY(Integer)))
+    ),
+)
+
+# unnest() zips the two arrays back into (fox_id, dog_id) rows, and RETURNING
+# only gives back the rows that were not already in the table
+_insert_links = (
+    pg_insert(models.FoxDogLink.__table__)
+    .from_select(
+        ["fox_id", "dog_id"],
+        select(
+            func.unnest(bindparam("fox_ids", type_=ARRAY(Integer))),
+            func.unnest(bindparam("dog_ids", type_=ARRAY(Integer))),
+        ),
+    )
+    .on_conflict_do_nothing()
+    .returning(models.FoxDogLink.fox_id, models.FoxDogLink.dog_id)
+)
+
+
+async def bulk_link_foxes_to_dogs(
+    session: AsyncSession, links: Sequence[schemas.FoxDogLink], chunk_size: int
+) -> dict[str, Any]:
+    """
+    Validate every fox and dog id with one set based query, then insert the valid
+    pairs "chunk_size" at a time with "INSERT ... ON CONFLICT DO NOTHING",
+    all in one transaction.
+
+    :return: a dict matching the "FoxDogLinkBulkResult" schema
+    """
+    rejected: list[dict[str, Any]] = []
+
+    def reject(pair: tuple[int, int], reason: LinkRejection):
+        rejected.append({"fox_id": pair[0], "dog_id": pair[1], "reason": reason})
+
+    # dict keeps the request order while dropping repeated pairs
+    pairs: dict[tuple[int, int], None] = {}
+    for link in links:
+        pair = (link.fox_id, link.dog_id)
+        if pair in pairs:
+            reject(pair, LinkRejection.DUPLICATE)
+        else:
+            pairs[pair] = None
+
+    query_res = await session.execute(
+        _existing_ids,
+        {
+            "fox_ids": list({fox_id for fox_id, _ in pairs}),
+            "dog_ids": list({dog_id for _, dog_id in pairs}),
+        },
+    )
+    existing_foxes: set[int] = set()
+    existing_dogs: set[int] = set()
+    for kind, id in query_res:
+        (existing_foxes if kind == "fox" else existing_dogs).add(id)
+
+    valid: list[tuple[int, int]] = []
+    for pair in pairs:
+        if pair[0] not in existing_foxes:
+            reject(pair, LinkRejection.FOX_NOT_FOUND)
+        elif pair[1] not in existing_dogs:
+            reject(pair, LinkRejection.DOG_NOT_FOUND)
+        else:
+            valid.append(pair)
+
+    inserted: set[tuple[int, int]] = set()
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start : start + chunk_size]
+        query_res = await session.execute(
+            _insert_links,
+            {
+                "fox_ids": [fox_id for fox_id, _ in chunk],
+                "dog_ids": [dog_id for _, dog_id in chunk],
+            },
+        )
+        inserted.update(tuple(row) for row in query_res)
+    await session.commit()
+
+    for pair in valid:
+        if pair not in inserted:
+            reject(pair, LinkRejection.ALREADY_EXISTS)
+
+    return {"inserted": len(inserted), "rejected": rejected}
+
+
+async def warm_up(session: AsyncSession):
+    """
+    Run the queries of the hot GET routes once, the first page and a missing id,
+    so the connection of "session" has their prepared statements cached.
+    """
+    page = PageParams(limit=pagination_config.PAGE_SIZE_DEFAULT, cursor=None)
+    for serializer, keyset, missing in [
+        (fox_serializer, [models.Fox.id], 0),
+        (dog_serializer, [models.Dog.id], 0),
+        (
+            example_serializer,
+            [models.Example.datetime_obj, models.Example.uuid],
+            UUID(int=0),
+        ),
+    ]:
+        statement = select(*serializer.columns)
+        model = keyset[0].class_
+        await page_version(session, statement, keyset, page, model.updated_at)
+        await paginate_rows(session, statement, keyset, page, serializer)
+        await paginate_rows_versioned(
+            session, statement, keyset, page, serializer, model.updated_at
+        )
+        await session.execute(select_row(serializer, keyset[-1], missing))
+    await get_dogs_jumped_over_by_fox(session, 0)
+    await get_foxes_that_jumped_over_dog(session, 0)
@@ -0,0 +1,7 @@
+from fastapi.exceptions import HTTPException
+from fastapi import status
+
+
+invalid_cursor = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor"
+)
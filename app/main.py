@@ -1,12 +1,115 @@
 # ENTRY POINT FOR THE APPLICATION
 
-from fastapi import FastAPI
-from app.example.router import router as example_router
-from app.auth.router import router as auth_router
-from app.models import Base  # noqa: F401
+# Taken before the other imports, so the startup time includes importing the app
+import time
 
+IMPORT_STARTED = time.perf_counter()
 
-app = FastAPI()
+import asyncio  # noqa: E402
+import logging  # noqa: E402
+from contextlib import asynccontextmanager  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy.orm import configure_mappers  # noqa: E402
+from app import database  # noqa: E402
+from app.example.router import router as example_router  # noqa: E402
+from app.example import schemas as example_schemas  # noqa: E402
+from app.example import service as example_service  # noqa: E402
+from app.auth.router import router as auth_router  # noqa: E402
+from app.auth import dependencies as auth_dependencies  # noqa: E402
+from app.auth.config import auth_config  # noqa: E402
+from app.auth.revocation import revocation_list  # noqa: E402
+from app.auth.utils import password_hasher  # noqa: E402
+from app.config import database_config, metrics_config  # noqa: E402
+from app.metrics import MetricsMiddleware, registry  # noqa: E402
+from app.metrics import router as metrics_router  # noqa: E402
+from app.pagination import Page  # noqa: E402
+from app.responses import prepare_adapters  # noqa: E402
+from app.sql_timing import SqlTimingMiddleware  # noqa: E402
+from app.models import Base  # noqa: F401, E402
+
+
+logger = logging.getLogger("app.startup")
+
+startup_seconds = registry.gauge(
+    "app_startup_seconds",
+    "Seconds from importing the app to the end of each startup phase",
+    ("phase",),
+)
+
+
+def configure_logging():
+    # Uvicorn only sets up its own loggers, this prints the INFO logs of the app next
+    # to them. Not all of "app", the pools log every reconnect on "app.database.*"
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s %(message)s"))
+    for name in ("app.startup", "app.access", "app.sql"):
+        named_logger = logging.getLogger(name)
+        if not named_logger.handlers:
+            named_logger.addHandler(handler)
+            named_logger.setLevel(logging.INFO)
+            named_logger.propagate = False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    imported = time.perf_counter() - IMPORT_STARTED
+
+    # Everything the first requests would otherwise pay for: the mappers of the
+    # relationships, the pydantic serializers, the OpenAPI schema, pooled
+    # connections and their prepared statements
+    configure_mappers()
+    prepare_adapters(
+        Page[example_schemas.Fox],
+        Page[example_schemas.Dog],
+        example_schemas.Fox,
+        example_schemas.Dog,
+    )
+    app.openapi()
+    if auth_config.BCRYPT_TARGET_SECONDS > 0:
+        rounds = await password_hasher.calibrate(
+            auth_config.BCRYPT_TARGET_SECONDS, auth_config.BCRYPT_MIN_ROUNDS
+        )
+        logger.info(
+            "bcrypt cost %d for %.3fs hashes", rounds, auth_config.BCRYPT_TARGET_SECONDS
+        )
+    await database.warm_up([example_service.warm_up, auth_dependencies.warm_up])
+    await revocation_list.update(rebuild=True)
+    revocation_task = asyncio.create_task(
+        revocation_list.keep_fresh(
+            auth_config.REVOCATION_REFRESH_SECONDS,
+            auth_config.REVOCATION_REBUILD_SECONDS,
+        )
+    )
+    replica_check_task = asyncio.create_task(
+        database.replica_router.keep_checked(database_config.DB_REPLICA_CHECK_SECONDS)
+    )
+
+    ready = time.perf_counter() - IMPORT_STARTED
+    startup_seconds.set(imported, ("import",))
+    startup_seconds.set(ready, ("ready",))
+    logger.info("Ready in %.3fs, %.3fs of it importing", ready, imported)
+
+    yield
+
+    revocation_task.cancel()
+    replica_check_task.cancel()
+    password_hasher.shutdown()
+    await database.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth_router)
 app.include_router(example_router)
+
+app.add_middleware(
+    SqlTimingMiddleware,
+    server_timing=metrics_config.SERVER_TIMING_ENABLED,
+    access_log=metrics_config.ACCESS_LOG_ENABLED,
+    repeat_threshold=database_config.DB_REPEATED_STATEMENT_WARNING,
+)
+configure_logging()
+
+if metrics_config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
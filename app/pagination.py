@@ -0,0 +1,295 @@
+### IMPORTS ###
+# External Libraries
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Any, Generic, Iterable, List, Sequence, TypeVar
+from fastapi import Query, Request, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql.expression import Select, cast, func, literal, select, tuple_
+from sqlalchemy.sql.sqltypes import BigInteger
+
+# Internal Libraries
+from app.config import pagination_config
+from app.exceptions import invalid_cursor
+from app.responses import (
+    RowSerializer,
+    conditional_response,
+    etag_matches,
+    make_etag,
+    not_modified,
+    to_json,
+)
+
+
+### CODE ###
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    # Opaque cursor to pass back as "?cursor=" to get the next page,
+    # it is None when there are no more rows
+    next: str | None = None
+
+
+class PageParams:
+    """
+    Query parameters shared by every paginated list endpoint, use it as a dependency:
+    "page: PageParams = Depends()"
+    """
+
+    def __init__(
+        self,
+        limit: Annotated[
+            int, Query(ge=1, le=pagination_config.PAGE_SIZE_MAX)
+        ] = pagination_config.PAGE_SIZE_DEFAULT,
+        cursor: Annotated[str | None, Query()] = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the keyset values of the last row of a page into an opaque, url safe cursor.
+    """
+    raw = json.dumps(list(values), default=_to_json, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keyset: Sequence[InstrumentedAttribute]) -> list[Any]:
+    """
+    Decode a cursor made by "encode_cursor" back into python values,
+    using the python types of the keyset columns.
+
+    :raises HTTPException: 400 if the cursor was not made by us
+    """
+    try:
+        # The padding was stripped while encoding
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keyset):
+            raise invalid_cursor
+        return [
+            _decode_cursor_value(column.type.python_type, value)
+            for column, value in zip(keyset, values)
+        ]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise invalid_cursor
+
+
+def _decode_cursor_value(python_type: type, value: Any) -> Any:
+    # Only the JSON types "encode_cursor" writes for each column type are accepted,
+    # "bool" is a subclass of "int" so it has to be ruled out on its own
+    if python_type is int:
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise invalid_cursor
+        return value
+    if not isinstance(value, str):
+        raise invalid_cursor
+    if python_type is datetime:
+        decoded = datetime.fromisoformat(value)
+        # Compared with "timestamptz" columns, a naive one would be read in the
+        # time zone of the database session
+        if decoded.tzinfo is None:
+            raise invalid_cursor
+        return decoded
+    # UUID(...) accepts its own str() output
+    return python_type(value)
+
+
+def page_statement(
+    statement: Select, keyset: Sequence[InstrumentedAttribute], page: PageParams
+) -> Select:
+    """
+    "statement" limited to the rows of "page", the query "paginate" runs.
+    """
+    if page.cursor is not None:
+        values = decode_cursor(page.cursor, keyset)
+        statement = statement.where(tuple_(*keyset) > tuple_(*values))
+
+    # Fetching one extra row tells us if there is a next page without a COUNT query
+    return statement.order_by(*keyset).limit(page.limit + 1)
+
+
+async def paginate(
+    session: AsyncSession,
+    statement: Select,
+    keyset: Sequence[InstrumentedAttribute],
+    page: PageParams,
+) -> dict[str, Any]:
+    """
+    Run "statement" as one keyset (seek) page ordered by the "keyset" columns.
+
+    The columns together must be unique, so the order is total, and they should be
+    covered by an index, so every page is an index range scan no matter how deep
+    the client pages, unlike OFFSET which has to walk all the skipped rows.
+
+    :return: a dict matching the "Page" schema, so FastAPI can validate it against
+    "response_model=Page[schemas.X]"
+    """
+    statement = page_statement(statement, keyset, page)
+    query_res = await session.execute(statement)
+    items = query_res.scalars().all()
+
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[: page.limit]
+        next_cursor = encode_cursor(
+            [getattr(items[-1], column.key) for column in keyset]
+        )
+
+    return {"items": items, "next": next_cursor}
+
+
+async def paginate_rows(
+    session: AsyncSession,
+    statement: Select,
+    keyset: Sequence[InstrumentedAttribute],
+    page: PageParams,
+    serializer: RowSerializer,
+) -> dict[str, Any]:
+    """
+    Same as "paginate" for a "select(*serializer.columns)" statement, the items are
+    plain dicts, so the page can go straight to "to_json".
+    """
+    statement = page_statement(statement, keyset, page)
+    query_res = await session.execute(statement)
+    return _page_of(serializer.items(query_res.all()), keyset, page)
+
+
+def _page_of(
+    items: list[dict[str, Any]],
+    keyset: Sequence[InstrumentedAttribute],
+    page: PageParams,
+) -> dict[str, Any]:
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[: page.limit]
+        next_cursor = encode_cursor([items[-1][column.key] for column in keyset])
+
+    return {"items": items, "next": next_cursor}
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _fingerprint_column(column: Any) -> Any:
+    # Timestamps are hashed as microseconds since the epoch, the text Postgres gives
+    # for them depends on the "TimeZone" setting and Python could not match it
+    if column.type.python_type is datetime:
+        return cast(func.extract("epoch", column) * 1_000_000, BigInteger)
+    return column
+
+
+def _fingerprint_text(value: Any) -> str:
+    if isinstance(value, datetime):
+        return str((value - _EPOCH) // timedelta(microseconds=1))
+    return str(value)
+
+
+def rows_version(rows: Iterable[Sequence[Any]]) -> str | None:
+    """
+    The "page_version" of a page computed from its rows, each made of the keyset
+    values followed by the version, in page order and with the extra row included.
+    """
+    fingerprint = ",".join(
+        ":".join(_fingerprint_text(value) for value in row) for row in rows
+    )
+    if not fingerprint:
+        return None
+    return hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+async def page_version(
+    session: AsyncSession,
+    statement: Select,
+    keyset: Sequence[InstrumentedAttribute],
+    page: PageParams,
+    version: InstrumentedAttribute,
+) -> str | None:
+    """
+    Cheap fingerprint of the page "paginate" would return, an md5 of the keyset
+    and "version" (e.g. "updated_at") of its rows computed by Postgres. It changes
+    when a row of the page is updated, deleted or inserted, but only reads two
+    columns and sends back one string, so conditional GETs skip the full query.
+    "rows_version" gives the same value from rows already fetched.
+    """
+    rows = page_statement(statement, keyset, page).with_only_columns(*keyset, version)
+    columns = list(rows.subquery().c)
+    fingerprint = select(
+        func.md5(
+            func.string_agg(
+                func.concat_ws(":", *map(_fingerprint_column, columns)),
+                aggregate_order_by(literal(","), *columns[: len(keyset)]),
+            )
+        )
+    )
+    query_res = await session.execute(fingerprint)
+    return query_res.scalar_one()
+
+
+async def paginate_rows_versioned(
+    session: AsyncSession,
+    statement: Select,
+    keyset: Sequence[InstrumentedAttribute],
+    page: PageParams,
+    serializer: RowSerializer,
+    version: InstrumentedAttribute,
+) -> tuple[dict[str, Any], str | None]:
+    """
+    "paginate_rows" and the "page_version" of the same page with one query, the
+    keyset and "version" are selected after the columns of "serializer".
+
+    :return: the page and its version
+    """
+    columns = [*keyset, version]
+    query_res = await session.execute(
+        page_statement(statement.add_columns(*columns), keyset, page)
+    )
+    rows = query_res.all()
+    items = serializer.items(rows)
+    page_rows_version = rows_version(row[-len(columns) :] for row in rows)
+    return _page_of(items, keyset, page), page_rows_version
+
+
+async def conditional_page(
+    request: Request,
+    session: AsyncSession,
+    statement: Select,
+    keyset: Sequence[InstrumentedAttribute],
+    page: PageParams,
+    serializer: RowSerializer,
+    version: InstrumentedAttribute,
+) -> Response:
+    """
+    The "paginate_rows" page of "statement" as JSON, its ETag made from its
+    "page_version". Only when the client sent If-None-Match is the version asked
+    first, so a 304 skips the page query, otherwise it comes with the page.
+    """
+    if "if-none-match" not in request.headers:
+        items, fingerprint = await paginate_rows_versioned(
+            session, statement, keyset, page, serializer, version
+        )
+        return conditional_response(
+            request, lambda: to_json(items), make_etag(fingerprint)
+        )
+
+    etag = make_etag(await page_version(session, statement, keyset, page, version))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    items = await paginate_rows(session, statement, keyset, page, serializer)
+    return conditional_response(request, lambda: to_json(items), etag)
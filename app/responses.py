@@ -0,0 +1,168 @@
+### IMPORTS ###
+# External Libraries
+import functools
+import hashlib
+import pydantic_core
+from typing import Any, Callable, Iterable, Sequence
+from fastapi import Request, Response, status
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+# Internal Libraries
+from app.cache import CacheKey, result_cache
+from app.config import cache_config
+from app.database import READ_YOUR_WRITES_HEADER, reads_from_replica
+
+
+### CODE ###
+
+
+@functools.cache
+def _adapter(schema: Any) -> TypeAdapter:
+    # Building a TypeAdapter compiles a validator and a serializer, do it once per schema
+    return TypeAdapter(schema)
+
+
+def prepare_adapters(*schemas: Any):
+    """
+    Build the adapters "dump_json" uses for "schemas" now instead of on the
+    first request that needs them.
+    """
+    for schema in schemas:
+        _adapter(schema)
+
+
+def dump_json(schema: Any, value: Any) -> bytes:
+    """
+    Validate "value" (ORM objects included) against "schema" and serialize it to JSON,
+    the same as FastAPI does with "response_model=schema".
+    """
+    adapter = _adapter(schema)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def to_json(value: Any) -> bytes:
+    """
+    Serialize plain python data (dicts, lists, enums, datetimes, UUIDs...) with the
+    JSON encoder of pydantic, without any validation. The output is byte for byte
+    the same as "dump_json" gives for a schema with the same fields.
+    """
+    return pydantic_core.to_json(value)
+
+
+class RowSerializer:
+    """
+    Fast path for routes that only serialize data, "columns" are the columns of
+    "model" behind the fields of "schema", select them with "select(*columns)"
+    and turn the rows into dicts ready for "to_json".
+
+    It skips the ORM (identity map, object creation) and the attribute by attribute
+    validation of "from_attributes", the data comes from our own database with
+    the types of the schema already, so the response is the same.
+    """
+
+    def __init__(self, schema: type[BaseModel], model: Any):
+        column_keys = model.__mapper__.column_attrs.keys()
+        self.fields = [name for name in schema.model_fields if name in column_keys]
+        self.columns = [getattr(model, name) for name in self.fields]
+        # Fields that are not columns (e.g. relationships) get their default,
+        # copying this keeps the field order of the schema
+        self._template = {
+            name: field.default for name, field in schema.model_fields.items()
+        }
+
+    def item(self, row: Sequence[Any]) -> dict[str, Any]:
+        # Extra columns selected after "columns" are ignored by zip
+        item = self._template.copy()
+        item.update(zip(self.fields, row))
+        return item
+
+    def items(self, rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+        return [self.item(row) for row in rows]
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Strong ETag from values that change whenever the representation changes,
+    e.g. the id and the "updated_at" of a row.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    # If-None-Match uses the weak comparison, so "W/" prefixes are ignored
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/")
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def conditional_response(
+    request: Request, render: Callable[[], bytes], etag: str | None = None
+) -> Response:
+    """
+    Answer with 304 when the client already has the current representation.
+
+    :param render: makes the JSON body, it is not called when "etag" is known
+    and the client sent it back in If-None-Match
+    :param etag: ETag computed without rendering the body (e.g. from row versions),
+    when None it is the hash of the rendered body
+    """
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag)
+
+    body = render()
+    if etag is None:
+        etag = make_etag(body)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+async def cached_response(request: Request, cache_key: CacheKey) -> Response | None:
+    """
+    :return: the response for "cache_key" from the result cache, None on a miss or
+    when the client asked to read its own writes, which the cache may not have yet
+    """
+    if READ_YOUR_WRITES_HEADER in request.headers:
+        return None
+    cached = await result_cache.get(cache_key)
+    if cached is None:
+        return None
+    return conditional_response(request, lambda: cached.body, cached.etag)
+
+
+async def cache_response(
+    cache_key: CacheKey, response: Response, session: AsyncSession
+):
+    """
+    Store "response" under "cache_key", the key "cached_response" missed with.
+
+    :param session: the one the response was read with, a replica may not have
+    replayed a write made just before the key was taken, so what it read is not
+    cached for "RESULT_CACHE_REPLICA_LAG" seconds after an invalidation
+    """
+    # 304s have no body to cache
+    if response.status_code != status.HTTP_200_OK:
+        return
+    if reads_from_replica(session) and result_cache.changed_within(
+        cache_key.namespace, cache_config.RESULT_CACHE_REPLICA_LAG
+    ):
+        return
+    await result_cache.set(cache_key, response.headers["ETag"], response.body)
+
+
+# For the "responses" parameter of the route decorators, so 304 shows up in the docs
+NOT_MODIFIED_RESPONSE: dict[int | str, dict[str, Any]] = {
+    status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}
+}
@@ -0,0 +1,169 @@
+### IMPORTS ###
+# External Libraries
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.ext.asyncio.engine import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+### CODE ###
+
+access_logger = logging.getLogger("app.access")
+sql_logger = logging.getLogger("app.sql")
+
+
+class RequestSqlStats:
+    """
+    Statements run while serving one request and the time spent running them,
+    measured from sending the statement to the driver to getting its result.
+    """
+
+    __slots__ = ("statements", "duration", "shapes")
+
+    def __init__(self, count_shapes: bool):
+        self.statements = 0
+        self.duration = 0.0
+        # Runs per SQL string, the parameters are not part of it, so a statement
+        # run in a loop over ids is one shape. None when nobody looks at it
+        self.shapes: dict[str, int] | None = {} if count_shapes else None
+
+
+# Set by "SqlTimingMiddleware" for every request, None outside of requests
+# (migrations, background tasks), which are not counted
+_request_stats: ContextVar[RequestSqlStats | None] = ContextVar(
+    "request_sql_stats", default=None
+)
+
+
+# The start time is kept on the execution context, which is dropped with the
+# statement, "after_cursor_execute" does not fire for a statement that failed
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+):
+    if _request_stats.get() is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+):
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.duration += time.perf_counter() - context._query_started
+    stats.statements += 1
+    if stats.shapes is not None:
+        stats.shapes[statement] = stats.shapes.get(statement, 0) + 1
+
+
+def instrument_engine(async_engine: AsyncEngine):
+    """
+    Count the statements "async_engine" runs for the request being served.
+    The events fire in the greenlet SQLAlchemy runs the driver in, which shares
+    the context of the request task, so they see its "RequestSqlStats".
+    """
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute
+    )
+    event.listen(
+        async_engine.sync_engine, "after_cursor_execute", _after_cursor_execute
+    )
+
+
+class SqlTimingMiddleware:
+    """
+    Pure ASGI middleware that collects the SQL statements of every request and
+    reports them as a "Server-Timing" header (e.g. 'db;dur=4.2;desc="3 statements"')
+    and in the "app.access" log.
+
+    When "repeat_threshold" is above 0, requests running the same statement more
+    than that many times are logged as warnings on "app.sql", it is the signature
+    of an N+1 query, loading a relationship one parent at a time.
+
+    Responses are streamed after the headers are sent, the header of a streamed
+    response only counts the statements run before its first chunk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        server_timing: bool = True,
+        access_log: bool = True,
+        repeat_threshold: int = 0,
+    ):
+        self.app = app
+        self.server_timing = server_timing
+        self.access_log = access_log
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSqlStats(count_shapes=self.repeat_threshold > 0)
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    header = (
+                        f'db;dur={stats.duration * 1000:.3f};desc="'
+                        f'{stats.statements} statements", '
+                        f"app;dur={(time.perf_counter() - started) * 1000:.3f}"
+                    )
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", header.encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            self._report(scope, status_code, time.perf_counter() - started, stats)
+
+    def _report(
+        self, scope: Scope, status_code: int, elapsed: float, stats: RequestSqlStats
+    ):
+        if self.access_log:
+            access_logger.info(
+                "%s %s %d %.1fms db=%d/%.1fms",
+                scope["method"],
+                scope["path"],
+                status_code,
+                elapsed * 1000,
+                stats.statements,
+                stats.duration * 1000,
+            )
+        if stats.shapes:
+            for statement, count in stats.shapes.items():
+                if count > self.repeat_threshold:
+                    sql_logger.warning(
+                        "%s %s ran the same statement %d times, "
+                        "is it loading a relationship in a loop?\n%s",
+                        scope["method"],
+                        scope["path"],
+                        count,
+                        statement,
+                    )
+
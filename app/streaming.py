@@ -0,0 +1,81 @@
+### IMPORTS ###
+# External Libraries
+from collections.abc import AsyncGenerator, AsyncIterator, Sequence
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql.expression import Select
+from typing import Any
+
+# Internal Libraries
+from app.database import open_read_session, report_error
+
+
+### CODE ###
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _ndjson(schema: type[BaseModel], rows: Sequence[Any]) -> bytes:
+    return "".join(
+        schema.model_validate(row).model_dump_json() + "\n" for row in rows
+    ).encode()
+
+
+async def _ndjson_rows(
+    session: AsyncSession,
+    first: Sequence[Any],
+    partitions: AsyncIterator[Sequence[Any]],
+    schema: type[BaseModel],
+) -> AsyncGenerator[bytes]:
+    # The response outlives the request dependencies, so the stream owns its session,
+    # it is closed when the generator finishes or the client disconnects
+    async with session:
+        try:
+            yield _ndjson(schema, first)
+            async for rows in partitions:
+                yield _ndjson(schema, rows)
+        except (OSError, DBAPIError) as error:
+            report_error(session, error)
+            raise
+
+
+async def ndjson_response(
+    statement: Select, schema: type[BaseModel], yield_per: int
+) -> StreamingResponse:
+    """
+    Stream every row of "statement" as newline delimited JSON, serialized with "schema".
+    Memory usage depends on "yield_per", not on the number of rows.
+
+    The query runs and its first batch is fetched before the response is returned,
+    so failing to connect or to execute is an error response, not a 200 with an
+    empty or truncated body. Only an error in a later batch can still cut it short.
+    """
+    # Exports are long reads, a replica takes them off the primary when there is one.
+    # A replica that can't be reached is found here, before anything was sent, and
+    # the export moves to the next one or to the primary
+    while True:
+        session = open_read_session(autocommit=False)
+        try:
+            # "yield_per" makes asyncpg use a server side cursor, so only one
+            # batch of rows is held in memory at any time, the identity map only
+            # keeps weak references to unmodified objects so sent rows are
+            # garbage collected
+            result = await session.stream(
+                statement.execution_options(yield_per=yield_per)
+            )
+            partitions = result.scalars().partitions()
+            first = await anext(partitions, [])
+        except BaseException as error:
+            await session.close()
+            if isinstance(error, (OSError, DBAPIError)) and report_error(
+                session, error
+            ):
+                continue
+            raise
+        break
+    return StreamingResponse(
+        _ndjson_rows(session, first, partitions, schema),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
@@ -0,0 +1,91 @@
+"""
+Measures how long unrelated requests wait while a burst of logins runs bcrypt.
+
+A probe coroutine sleeps for 1ms in a loop, every millisecond it wakes up late is a
+millisecond that any other request on the same worker (e.g. "GET /dogs/{id}") would
+also have waited, so its lateness percentiles are the added latency of those routes.
+
+Usage (from the repository root):
+    python -m benchmarks.bcrypt_offload --logins 64
+"""
+
+### IMPORTS ###
+# External Libraries
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import bcrypt
+
+# Internal Libraries
+from app.auth.utils import password_hasher
+
+
+### CODE ###
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(samples: list[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def probe(lateness: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lateness.append((time.perf_counter() - started - 0.001) * 1000)
+
+
+async def inline_login(password_hash: str):
+    # What "login_for_access_token" used to do, bcrypt directly on the event loop
+    bcrypt.checkpw(PASSWORD.encode(), password_hash.encode())
+
+
+async def offloaded_login(password_hash: str):
+    await password_hasher.verify(PASSWORD, password_hash)
+
+
+async def run(mode: str, logins: int, password_hash: str) -> dict:
+    login = inline_login if mode == "inline" else offloaded_login
+    lateness: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lateness, stop))
+    # Let the probe take a baseline sample first
+    await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login(password_hash) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    return {
+        "mode": mode,
+        "logins": logins,
+        "logins_per_sec": round(logins / elapsed, 1),
+        "probe_samples": len(lateness),
+        "probe_p50_ms": round(statistics.median(lateness), 3),
+        "probe_p99_ms": round(percentile(lateness, 0.99), 3),
+        "probe_max_ms": round(max(lateness), 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=32)
+    args = parser.parse_args()
+
+    password_hash = await password_hasher.hash(PASSWORD)
+    results = [
+        await run("inline", args.logins, password_hash),
+        await run("offloaded", args.logins, password_hash),
+    ]
+    print(json.dumps(results, indent=2))
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,464 @@
+"""
+Drives every route with concurrent clients and reports throughput and latency as JSON.
+
+Run "benchmarks.seed" first. Without "--base-url" the app is served in process
+through httpx's ASGI transport, which measures the app alone (no HTTP parsing,
+no network) but shares the CPU with the clients. Point "--base-url" at a running
+uvicorn to measure the whole stack.
+
+For every scenario it reports requests per second, p50/p95/p99 latency in
+milliseconds, the errors and the SQL statements per request read from the
+"Server-Timing" header. The bulk link also reports the links it inserted per
+second, pairs already linked are rejected. Save the output of two commits and
+compare them.
+
+Usage (from the repository root):
+    python -m benchmarks.load --requests 2000 --concurrency 32 > before.json
+    python -m benchmarks.load --base-url http://localhost:3000 --scenarios get_fox
+"""
+
+### IMPORTS ###
+# External Libraries
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import subprocess
+import time
+from typing import Awaitable, Callable, NamedTuple
+import httpx
+
+# Internal Libraries
+from benchmarks.bcrypt_offload import percentile
+from benchmarks.seed import PASSWORD, USERNAME_PREFIX
+
+### CODE ###
+
+STATEMENTS = re.compile(r'desc="(\d+) statements"')
+
+
+class Context:
+    """
+    Ids that exist in the seeded database and a logged in user, shared by the scenarios.
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.fox_ids: list[int] = []
+        self.dog_ids: list[int] = []
+        self.example_ids: list[str] = []
+        self.token = ""
+        # One per concurrent client, every refresh replaces the token it used
+        self.refresh_tokens: list[str] = []
+        # Used up by "logout" and "revoke", one per request, made by their "setup"
+        self.logout_tokens: list[str] = []
+        self.revoke_tokens: list[str] = []
+        # New foxes for "link_fox_to_dog", a link already stored fails with 500
+        self.link_fox_ids: list[int] = []
+        self.counter = itertools.count()
+
+    def fox_id(self) -> int:
+        return self.rng.choice(self.fox_ids)
+
+    def dog_id(self) -> int:
+        return self.rng.choice(self.dog_ids)
+
+    def unique(self) -> str:
+        # Unique per run, new users and bulk names must not clash with earlier runs
+        return f"{time.time_ns()}-{next(self.counter)}"
+
+
+Request = Callable[[httpx.AsyncClient, Context], Awaitable[httpx.Response]]
+# Runs before the clock starts, with the number of requests the scenario will send
+Setup = Callable[[httpx.AsyncClient, Context, int], Awaitable[None]]
+
+
+class Scenario(NamedTuple):
+    name: str
+    request: Request
+    # Share of "--requests" it runs, the slow routes (bcrypt, bulk) run fewer
+    weight: float = 1.0
+    setup: Setup | None = None
+    # Rows a successful response stored, reported as "inserted_per_sec"
+    inserted: Callable[[httpx.Response], int] | None = None
+
+
+class RequestFailed(Exception):
+    """
+    A request the scenario could not send, counted in "errors" by its message.
+    """
+
+
+def animal(ctx: Context) -> dict:
+    return {"name": f"bench {ctx.unique()}", "age": ctx.rng.randint(0, 20)}
+
+
+async def refresh(c: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    # A failed refresh does not give the token back, once all of them are lost
+    # the remaining requests are errors
+    if not ctx.refresh_tokens:
+        raise RequestFailed("no refresh token left")
+    response = await c.post(
+        "/api/token/refresh", data={"refresh_token": ctx.refresh_tokens.pop()}
+    )
+    if response.status_code == 201:
+        ctx.refresh_tokens.append(response.json()["refresh_token"])
+    return response
+
+
+async def setup_link(c: httpx.AsyncClient, ctx: Context, requests: int):
+    response = await c.post("/foxes/bulk", json=[animal(ctx) for _ in range(requests)])
+    response.raise_for_status()
+    ctx.link_fox_ids = [fox["id"] for fox in response.json()]
+
+
+async def link(c: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await c.post(
+        "/fox_jumped_over_dog",
+        json={"fox_id": ctx.link_fox_ids.pop(), "dog_id": ctx.dog_id()},
+    )
+
+
+async def setup_logout(c: httpx.AsyncClient, ctx: Context, requests: int):
+    # Access tokens through the refresh grant of one login, without bcrypt
+    refresh_token = (await login(c))["refresh_token"]
+    for _ in range(requests):
+        response = await c.post(
+            "/api/token/refresh", data={"refresh_token": refresh_token}
+        )
+        response.raise_for_status()
+        ctx.logout_tokens.append(response.json()["access_token"])
+        refresh_token = response.json()["refresh_token"]
+
+
+async def logout(c: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await c.post(
+        "/logout", headers={"Authorization": f"Bearer {ctx.logout_tokens.pop()}"}
+    )
+
+
+async def setup_revoke(c: httpx.AsyncClient, ctx: Context, requests: int):
+    # One login each, revoking a token revokes its whole family
+    tokens = await asyncio.gather(*(login(c) for _ in range(requests)))
+    ctx.revoke_tokens = [token["refresh_token"] for token in tokens]
+
+
+async def revoke(c: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await c.post(
+        "/api/token/revoke", data={"refresh_token": ctx.revoke_tokens.pop()}
+    )
+
+
+SCENARIOS = [
+    # Reads
+    Scenario("list_foxes", lambda c, ctx: c.get("/foxes")),
+    Scenario("list_foxes_include", lambda c, ctx: c.get("/foxes?include=jumped_over")),
+    Scenario("get_fox", lambda c, ctx: c.get(f"/foxes/{ctx.fox_id()}")),
+    # The same 50 foxes as 50 "get_fox" requests, compare per fox
+    Scenario(
+        "get_foxes_batch",
+        lambda c, ctx: c.get(
+            "/foxes/batch",
+            params={"ids": ",".join(str(ctx.fox_id()) for _ in range(50))},
+        ),
+    ),
+    Scenario(
+        "post_foxes_batch",
+        lambda c, ctx: c.post("/foxes/batch", json=[ctx.fox_id() for _ in range(50)]),
+    ),
+    Scenario(
+        "get_fox_include",
+        lambda c, ctx: c.get(f"/foxes/{ctx.fox_id()}?include=jumped_over"),
+    ),
+    Scenario(
+        "get_fox_jumped_over",
+        lambda c, ctx: c.get(f"/foxes/{ctx.fox_id()}/jumped_over"),
+    ),
+    Scenario("list_dogs", lambda c, ctx: c.get("/dogs")),
+    Scenario("list_dogs_include", lambda c, ctx: c.get("/dogs?include=jumped_over_by")),
+    Scenario("get_dog", lambda c, ctx: c.get(f"/dogs/{ctx.dog_id()}")),
+    Scenario(
+        "get_dogs_batch",
+        lambda c, ctx: c.get(
+            "/dogs/batch",
+            params={"ids": ",".join(str(ctx.dog_id()) for _ in range(50))},
+        ),
+    ),
+    Scenario(
+        "post_dogs_batch",
+        lambda c, ctx: c.post("/dogs/batch", json=[ctx.dog_id() for _ in range(50)]),
+    ),
+    Scenario(
+        "get_dog_jumped_over_by",
+        lambda c, ctx: c.get(f"/dogs/{ctx.dog_id()}/jumped_over_by"),
+    ),
+    Scenario("list_examples", lambda c, ctx: c.get("/examples")),
+    Scenario(
+        "get_example",
+        lambda c, ctx: c.get(f"/examples/{ctx.rng.choice(ctx.example_ids)}"),
+    ),
+    Scenario(
+        "get_examples_batch",
+        lambda c, ctx: c.get(
+            "/examples/batch",
+            params={"ids": ",".join(ctx.rng.sample(ctx.example_ids, 50))},
+        ),
+    ),
+    Scenario(
+        "post_examples_batch",
+        lambda c, ctx: c.post(
+            "/examples/batch", json=ctx.rng.sample(ctx.example_ids, 50)
+        ),
+    ),
+    Scenario(
+        "search",
+        lambda c, ctx: c.get(
+            "/search", params={"q": f"fox {ctx.rng.randint(0, 9999)}"}
+        ),
+    ),
+    Scenario("export_foxes", lambda c, ctx: c.get("/foxes/export"), 0.01),
+    Scenario("export_dogs", lambda c, ctx: c.get("/dogs/export"), 0.01),
+    Scenario("export_examples", lambda c, ctx: c.get("/examples/export"), 0.01),
+    Scenario(
+        "users_me",
+        lambda c, ctx: c.get(
+            "/users/me", headers={"Authorization": f"Bearer {ctx.token}"}
+        ),
+    ),
+    Scenario("jwks", lambda c, ctx: c.get("/.well-known/jwks.json")),
+    Scenario("metrics", lambda c, ctx: c.get("/metrics"), 0.1),
+    # Writes
+    Scenario("create_fox", lambda c, ctx: c.post("/foxes", json=animal(ctx)), 0.25),
+    Scenario(
+        "create_foxes_bulk",
+        lambda c, ctx: c.post("/foxes/bulk", json=[animal(ctx) for _ in range(100)]),
+        0.05,
+    ),
+    Scenario("create_dog", lambda c, ctx: c.post("/dogs", json=animal(ctx)), 0.25),
+    Scenario(
+        "create_dogs_bulk",
+        lambda c, ctx: c.post("/dogs/bulk", json=[animal(ctx) for _ in range(100)]),
+        0.05,
+    ),
+    Scenario(
+        "create_example",
+        lambda c, ctx: c.post(
+            "/examples", json={"string": ctx.unique(), "integer": ctx.rng.randint(0, 9)}
+        ),
+        0.25,
+    ),
+    Scenario(
+        "create_examples_bulk",
+        lambda c, ctx: c.post(
+            "/examples/bulk",
+            json=[
+                {"string": ctx.unique(), "integer": ctx.rng.randint(0, 9)}
+                for _ in range(100)
+            ],
+        ),
+        0.05,
+    ),
+    Scenario("link_fox_to_dog", link, 0.25, setup_link),
+    Scenario(
+        "link_foxes_to_dogs_bulk",
+        lambda c, ctx: c.post(
+            "/fox_jumped_over_dog/bulk",
+            json=[
+                {"fox_id": ctx.fox_id(), "dog_id": ctx.dog_id()} for _ in range(1000)
+            ],
+        ),
+        0.05,
+        # Pairs already linked are rejected, so it can be well below 1000
+        inserted=lambda response: response.json()["inserted"],
+    ),
+    # The refresh token grant, what clients run instead of "login"
+    Scenario("refresh", refresh, 0.25),
+    Scenario("logout", logout, 0.25, setup_logout),
+    Scenario("revoke", revoke, 0.02, setup_revoke),
+    # bcrypt, a few hundred milliseconds of CPU each
+    Scenario(
+        "login",
+        lambda c, ctx: c.post(
+            "/api/token",
+            data={"username": f"{USERNAME_PREFIX}0", "password": PASSWORD},
+        ),
+        0.02,
+    ),
+    Scenario(
+        "register",
+        lambda c, ctx: c.post(
+            "/register",
+            json={"username": f"bench-new-{ctx.unique()}", "password": PASSWORD},
+        ),
+        0.02,
+    ),
+]
+
+
+async def collect_ids(client: httpx.AsyncClient, path: str, key: str) -> list:
+    # A few pages are enough to spread the reads over the table
+    ids, cursor = [], None
+    for _ in range(4):
+        params = {"limit": 500, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(path, params=params)
+        response.raise_for_status()
+        page = response.json()
+        ids.extend(item[key] for item in page["items"])
+        cursor = page["next"]
+        if cursor is None:
+            break
+    if not ids:
+        raise SystemExit(f"{path} is empty, run 'python -m benchmarks.seed' first")
+    return ids
+
+
+async def login(client: httpx.AsyncClient) -> dict:
+    response = await client.post(
+        "/api/token", data={"username": f"{USERNAME_PREFIX}0", "password": PASSWORD}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def prepare(client: httpx.AsyncClient, ctx: Context, concurrency: int):
+    ctx.fox_ids = await collect_ids(client, "/foxes", "id")
+    ctx.dog_ids = await collect_ids(client, "/dogs", "id")
+    ctx.example_ids = await collect_ids(client, "/examples", "uuid")
+    tokens = await asyncio.gather(*(login(client) for _ in range(concurrency)))
+    ctx.token = tokens[0]["access_token"]
+    ctx.refresh_tokens = [token["refresh_token"] for token in tokens]
+
+
+async def run(
+    client: httpx.AsyncClient,
+    ctx: Context,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    if scenario.setup is not None:
+        await scenario.setup(client, ctx, requests)
+    latencies: list[float] = []
+    statements: list[int] = []
+    errors: dict[int | str, int] = {}
+    inserted = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal inserted
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await scenario.request(client, ctx)
+            except RequestFailed as error:
+                errors[str(error)] = errors.get(str(error), 0) + 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+            elif scenario.inserted is not None:
+                inserted += scenario.inserted(response)
+            match = STATEMENTS.search(response.headers.get("server-timing", ""))
+            if match:
+                statements.append(int(match.group(1)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": scenario.name,
+        "requests": requests,
+        "concurrency": min(concurrency, requests),
+        "requests_per_sec": round(requests / elapsed, 1),
+        **(
+            {"inserted_per_sec": round(inserted / elapsed, 1)}
+            if scenario.inserted is not None
+            else {}
+        ),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "statements_per_request": (
+            round(sum(statements) / len(statements), 2) if statements else None
+        ),
+        "errors": errors,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--scenarios",
+        default=None,
+        help="comma separated names, all of them by default",
+    )
+    parser.add_argument(
+        "--no-result-cache",
+        action="store_true",
+        help="send X-Read-Your-Writes on every request, it skips the result cache "
+        "and the replicas",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS
+    if args.scenarios:
+        names = set(args.scenarios.split(","))
+        scenarios = [scenario for scenario in SCENARIOS if scenario.name in names]
+
+    if args.base_url is None:
+        from app.main import app
+
+        # Unhandled errors become 500s, like uvicorn would answer them
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        base_url = "http://benchmark"
+    else:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=args.concurrency)
+        )
+        base_url = args.base_url
+
+    headers = {"X-Read-Your-Writes": "1"} if args.no_result_cache else {}
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, headers=headers, timeout=60
+    ) as client:
+        ctx = Context(random.Random(args.seed))
+        await prepare(client, ctx, args.concurrency)
+        results = []
+        for scenario in scenarios:
+            requests = max(1, int(args.requests * scenario.weight))
+            results.append(await run(client, ctx, scenario, requests, args.concurrency))
+
+    print(
+        json.dumps(
+            {
+                "commit": git_commit(),
+                "base_url": args.base_url,
+                "no_result_cache": args.no_result_cache,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+"""
+Checks that the filters of "/foxes" and "/dogs" and "/search" use their indexes.
+
+Every filter combination and a few searches are turned into the exact query of
+the route and run through EXPLAIN (ANALYZE) on the seeded database. The report lists the indexes the
+plan used, its nodes and how long it took, and the script exits with 1 when a
+selective filter did not use the index made for it, or any filter read the whole
+table, so it can gate a change to the filters, the models or the migrations.
+
+Broad filters (one type out of 12) are cheaper served by walking the primary key
+in page order until "limit" rows matched, those only have to avoid a "Seq Scan".
+Small tables are cheaper to read whole, so seed at least "--scale 1" first.
+
+"tests/test_query_plans.py" makes the same checks when "TEST_DATABASE_URL" is set.
+
+Usage (from the repository root):
+    python -m benchmarks.query_plans
+"""
+
+### IMPORTS ###
+# External Libraries
+import asyncio
+import json
+import sys
+from typing import Any, Iterator
+from sqlalchemy import text
+from sqlalchemy.sql.expression import Select, select
+
+# Internal Libraries
+from app.database import engine
+from app.example import models, service
+from app.example.constants import Color, Type
+from app.example.dependencies import AnimalFilters
+from app.pagination import PageParams, page_statement
+
+
+### CODE ###
+
+# Filters and the index that has to serve them on both tables, None for any index.
+# "{kind}" in a name prefix becomes "fox" or "dog", the names "benchmarks.seed" gives
+CASES: list[tuple[dict[str, Any], str | None]] = [
+    ({"type": Type.SAD}, None),
+    ({"color": Color.RED}, None),
+    ({"min_age": 3, "max_age": 4}, None),
+    ({"type": Type.SAD, "color": Color.RED}, "type_color_id"),
+    ({"type": Type.SAD, "color": Color.RED, "max_age": 10}, "type_color_id"),
+    ({"min_age": 7, "max_age": 7}, "age_id"),
+    ({"name_prefix": "{kind} 1234"}, "name_pattern"),
+]
+
+# Queries of "/search", close to the names "benchmarks.seed" gives and a typo
+SEARCHES = ["fox 1234", "dgo 42", "4321"]
+
+
+def plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(connection, statement) -> dict:
+    # Compiled for asyncpg, the default PostgreSQL driver would write "%" as "%%"
+    sql = statement.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    query_res = await connection.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"
+    )
+    return query_res.scalar_one()[0]
+
+
+def check(result: dict, expected_indexes: list[str]) -> dict:
+    nodes = list(plan_nodes(result["Plan"]))
+    indexes = [node["Index Name"] for node in nodes if "Index Name" in node]
+    node_types = [node["Node Type"] for node in nodes]
+    return {
+        "expected_indexes": expected_indexes,
+        "indexes": indexes,
+        "node_types": node_types,
+        "execution_ms": result["Execution Time"],
+        "ok": "Seq Scan" not in node_types
+        and all(index in indexes for index in expected_indexes),
+    }
+
+
+# The listed tables, with the serializer of their route and the kind of "CASES"
+TABLES = [
+    (models.Fox, service.fox_serializer, "fox"),
+    (models.Dog, service.dog_serializer, "dog"),
+]
+SEARCH_INDEXES = ["ix_foxes_name_trgm", "ix_dogs_name_trgm"]
+
+
+def filter_case(
+    model, serializer, kind: str, params: dict[str, Any], expected: str | None
+) -> tuple[dict[str, Any], Select, list[str]]:
+    """
+    The filters of a "CASES" entry for one table, the page query of the route with
+    them and the indexes its plan has to use.
+    """
+    if "name_prefix" in params:
+        params = {**params, "name_prefix": params["name_prefix"].format(kind=kind)}
+    filters = AnimalFilters(**params)
+    statement = page_statement(
+        filters.apply(select(*serializer.columns), model),
+        [model.id],
+        PageParams(limit=50, cursor=None),
+    )
+    expected_indexes = [f"ix_{model.__tablename__}_{expected}"] if expected else []
+    return params, statement, expected_indexes
+
+
+async def has_trigrams(connection) -> bool:
+    query_res = await connection.execute(
+        text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    )
+    return query_res.scalar_one_or_none() is not None
+
+
+async def main():
+    report = []
+    async with engine.connect() as connection:
+        for model, serializer, kind in TABLES:
+            for params, expected in CASES:
+                params, statement, expected_indexes = filter_case(
+                    model, serializer, kind, params, expected
+                )
+                report.append(
+                    {
+                        "table": model.__tablename__,
+                        "filters": {k: str(v) for k, v in params.items()},
+                        **check(await explain(connection, statement), expected_indexes),
+                    }
+                )
+
+        trigrams = await has_trigrams(connection)
+        for q in SEARCHES:
+            if not trigrams:
+                # The migration could not create it, "/search" answers with 500
+                report.append(
+                    {
+                        "table": "foxes, dogs",
+                        "search": q,
+                        "error": "pg_trgm is not installed",
+                        "ok": False,
+                    }
+                )
+                continue
+            statement = service.search_statement(q, 20)
+            report.append(
+                {
+                    "table": "foxes, dogs",
+                    "search": q,
+                    **check(await explain(connection, statement), SEARCH_INDEXES),
+                }
+            )
+
+    print(json.dumps(report, indent=2))
+    await engine.dispose()
+    if not all(entry["ok"] for entry in report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+"""
+Fills the database of the "DB_*" settings with foxes, dogs, links, examples and users.
+
+The data is random but seeded, so the same "--scale" and "--seed" give the same
+database, which keeps load test results comparable between commits. One unit of
+scale is 10 000 foxes, 10 000 dogs, 5 links per fox, 10 000 examples and 100 users.
+
+"--reset" empties foxes, dogs, links and examples and deletes the users made by
+a previous run, do not point it at a database you care about.
+
+Usage (from the repository root, after "alembic upgrade head"):
+    python -m benchmarks.seed --scale 1 --reset
+"""
+
+### IMPORTS ###
+# External Libraries
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql.expression import insert
+
+# Internal Libraries
+from app.auth import models as auth_models
+from app.auth.utils import password_hasher
+from app.database import AsyncSessionFactory, engine
+from app.example import models
+from app.example.constants import Color, Type
+
+
+### CODE ###
+
+# Every seeded user has this password, "benchmarks.load" logs in with it
+PASSWORD = "benchmark password"
+USERNAME_PREFIX = "bench-user-"
+
+CHUNK_SIZE = 10_000
+
+
+def chunks(rows: list, size: int = CHUNK_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def animal_rows(rng: random.Random, kind: str, count: int) -> list[dict]:
+    types = list(Type)
+    colors = list(Color)
+    return [
+        {
+            "name": f"{kind} {i}",
+            "age": rng.randint(0, 20),
+            "type": rng.choice(types),
+            "color": rng.choice(colors),
+        }
+        for i in range(count)
+    ]
+
+
+def example_rows(rng: random.Random, count: int) -> list[dict]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        moment = start + timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        rows.append(
+            {
+                "string": f"example {i}",
+                "integer": i,
+                "float_num": rng.random(),
+                "datetime_obj": moment,
+                "time_obj": moment.time(),
+                "date_obj": moment.date(),
+                "timedelta_obj": timedelta(seconds=rng.randint(0, 86400)),
+            }
+        )
+    return rows
+
+
+async def insert_returning_ids(session, model, rows: list[dict]) -> list[int]:
+    ids = []
+    for chunk in chunks(rows):
+        query_res = await session.execute(insert(model).returning(model.id), chunk)
+        ids.extend(query_res.scalars().all())
+    return ids
+
+
+async def reset(session):
+    await session.execute(
+        text("TRUNCATE foxes, dogs, fox_dog_links, examples RESTART IDENTITY CASCADE")
+    )
+    await session.execute(
+        text("DELETE FROM users WHERE username LIKE :prefix"),
+        {"prefix": USERNAME_PREFIX + "%"},
+    )
+
+
+async def seed(scale: float, links_per_fox: int, seed_value: int, do_reset: bool):
+    rng = random.Random(seed_value)
+    counts = {
+        "foxes": int(10_000 * scale),
+        "dogs": int(10_000 * scale),
+        "examples": int(10_000 * scale),
+        "users": max(1, int(100 * scale)),
+    }
+    timings = {}
+
+    async with AsyncSessionFactory() as session:
+        if do_reset:
+            await reset(session)
+
+        started = time.perf_counter()
+        fox_ids = await insert_returning_ids(
+            session, models.Fox, animal_rows(rng, "fox", counts["foxes"])
+        )
+        dog_ids = await insert_returning_ids(
+            session, models.Dog, animal_rows(rng, "dog", counts["dogs"])
+        )
+        timings["animals_sec"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        links = [
+            {"fox_id": fox_id, "dog_id": dog_id}
+            for fox_id in fox_ids
+            for dog_id in rng.sample(dog_ids, min(links_per_fox, len(dog_ids)))
+        ]
+        for chunk in chunks(links):
+            await session.execute(
+                pg_insert(models.FoxDogLink).on_conflict_do_nothing(), chunk
+            )
+        counts["fox_dog_links"] = len(links)
+        timings["links_sec"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for chunk in chunks(example_rows(rng, counts["examples"])):
+            await session.execute(insert(models.Example), chunk)
+        timings["examples_sec"] = time.perf_counter() - started
+
+        # One hash for everybody, bcrypt would take minutes at a large scale
+        started = time.perf_counter()
+        password_hash = await password_hasher.hash(PASSWORD)
+        await session.execute(
+            pg_insert(auth_models.User).on_conflict_do_nothing(),
+            [
+                {"username": f"{USERNAME_PREFIX}{i}", "password_hash": password_hash}
+                for i in range(counts["users"])
+            ],
+        )
+        timings["users_sec"] = time.perf_counter() - started
+
+        await session.commit()
+
+    # Fresh statistics, so the planner picks the same plans as in production
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(
+            text("ANALYZE foxes, dogs, fox_dog_links, examples, users")
+        )
+
+    return {
+        "scale": scale,
+        "seed": seed_value,
+        "rows": counts,
+        **{name: round(seconds, 3) for name, seconds in timings.items()},
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--links-per-fox", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true")
+    args = parser.parse_args()
+
+    result = await seed(args.scale, args.links_per_fox, args.seed, args.reset)
+    print(json.dumps(result, indent=2))
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
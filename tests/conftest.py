@@ -0,0 +1,45 @@
+### IMPORTS ###
+# External Libraries
+import pytest
+
+# Internal Libraries
+from app.cache import CacheBackend
+
+
+### CODE ###
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    # The app only runs on asyncio
+    return "asyncio"
+
+
+class FakeCacheBackend(CacheBackend):
+    """
+    Dict based "CacheBackend", entries never expire and every call is recorded,
+    so tests can see which keys were read and written.
+    """
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.calls: list[tuple[str, str]] = []
+
+    async def get(self, key: str) -> bytes | None:
+        self.calls.append(("get", key))
+        return self.data.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self.calls.append(("set", key))
+        self.data[key] = value
+
+    async def incr(self, key: str) -> int:
+        self.calls.append(("incr", key))
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+
+@pytest.fixture
+def cache_backend() -> FakeCacheBackend:
+    return FakeCacheBackend()
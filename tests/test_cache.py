@@ -0,0 +1,123 @@
+### IMPORTS ###
+# External Libraries
+import pytest
+
+# Internal Libraries
+from app import cache
+from app.cache import CacheKey, LRUCache, ResultCache
+
+
+### CODE ###
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert len(lru) == 2
+
+
+def test_lru_expires_entries(clock):
+    lru = LRUCache(2)
+    lru.set("a", 1, expires_at=clock.now + 10)
+    clock.now += 9
+    assert lru.get("a") == 1
+    clock.now += 1
+    assert lru.get("a") is None
+    assert len(lru) == 0
+    assert lru.stats()["hits"] == 1
+    assert lru.stats()["misses"] == 1
+
+
+def test_lru_of_size_zero_stores_nothing():
+    lru = LRUCache(0)
+    lru.set("a", 1)
+    assert lru.get("a") is None
+
+
+async def test_set_then_get(cache_backend):
+    result_cache = ResultCache(cache_backend, ttl=30)
+    key = await result_cache.key("foxes", "id:1")
+    assert key == CacheKey("foxes", 0, "id:1")
+    assert await result_cache.get(key) is None
+    await result_cache.set(key, '"etag"', b'{"id":1}')
+    cached = await result_cache.get(await result_cache.key("foxes", "id:1"))
+    assert cached == ('"etag"', b'{"id":1}')
+    assert result_cache.stats()["hits"] == 1
+    assert result_cache.stats()["misses"] == 1
+
+
+async def test_invalidate_misses_every_key_of_the_namespace(cache_backend):
+    result_cache = ResultCache(cache_backend, ttl=30)
+    for key in ("id:1", "page:50:None"):
+        await result_cache.set(await result_cache.key("foxes", key), '"e"', b"{}")
+    await result_cache.set(await result_cache.key("dogs", "id:1"), '"e"', b"{}")
+
+    await result_cache.invalidate("foxes")
+
+    for key in ("id:1", "page:50:None"):
+        assert await result_cache.get(await result_cache.key("foxes", key)) is None
+    assert await result_cache.get(await result_cache.key("dogs", "id:1")) is not None
+
+
+async def test_read_before_invalidate_is_stored_under_the_old_version(cache_backend):
+    result_cache = ResultCache(cache_backend, ttl=30)
+    # A GET misses and reads the database...
+    key = await result_cache.key("foxes", "id:1")
+    assert await result_cache.get(key) is None
+    # ...while a POST writes and invalidates...
+    await result_cache.invalidate("foxes")
+    # ...then the GET stores what it read before the write
+    await result_cache.set(key, '"old"', b"old")
+
+    assert await result_cache.get(await result_cache.key("foxes", "id:1")) is None
+    assert ("set", "foxes:0:id:1") in cache_backend.calls
+
+
+async def test_changed_within_after_invalidate(cache_backend, clock):
+    result_cache = ResultCache(cache_backend, ttl=30)
+    await result_cache.key("foxes", "id:1")
+    assert not result_cache.changed_within("foxes", 5)
+
+    await result_cache.invalidate("foxes")
+    assert result_cache.changed_within("foxes", 5)
+    assert not result_cache.changed_within("dogs", 5)
+    clock.now += 5
+    assert not result_cache.changed_within("foxes", 5)
+
+
+async def test_changed_within_sees_invalidations_of_other_workers(
+    cache_backend, clock
+):
+    worker = ResultCache(cache_backend, ttl=30)
+    other_worker = ResultCache(cache_backend, ttl=30)
+    await worker.key("foxes", "id:1")
+
+    await other_worker.invalidate("foxes")
+    assert not worker.changed_within("foxes", 5)
+    # Noticed on the first lookup after the bump
+    assert (await worker.key("foxes", "id:1")).version == 1
+    assert worker.changed_within("foxes", 5)
@@ -0,0 +1,87 @@
+### IMPORTS ###
+# External Libraries
+import base64
+import hashlib
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from uuid import UUID
+
+# Internal Libraries
+from app.example import models
+from app.pagination import decode_cursor, encode_cursor, rows_version
+
+
+### CODE ###
+
+EXAMPLE_KEYSET = [models.Example.datetime_obj, models.Example.uuid]
+FOX_KEYSET = [models.Fox.id]
+
+
+def raw_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "keyset, values",
+    [
+        (FOX_KEYSET, [42]),
+        (
+            EXAMPLE_KEYSET,
+            [
+                datetime(2026, 10, 18, 15, 47, 24, 708301, tzinfo=timezone.utc),
+                UUID("5bea8d36-c4dd-45e1-9549-abb41e38d726"),
+            ],
+        ),
+    ],
+)
+def test_cursor_round_trip(keyset, values):
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, keyset) == values
+
+
+@pytest.mark.parametrize(
+    "keyset, cursor",
+    [
+        (FOX_KEYSET, "not base64!"),
+        (FOX_KEYSET, raw_cursor({"id": 1})),
+        (FOX_KEYSET, raw_cursor([1, 2])),
+        (FOX_KEYSET, raw_cursor([True])),
+        (FOX_KEYSET, raw_cursor(["1"])),
+        (FOX_KEYSET, raw_cursor([1.5])),
+        (EXAMPLE_KEYSET, raw_cursor(["2020-01-01", 5])),
+        (EXAMPLE_KEYSET, raw_cursor([1, "5bea8d36-c4dd-45e1-9549-abb41e38d726"])),
+        (
+            EXAMPLE_KEYSET,
+            raw_cursor(["2020-01-01T00:00:00", "5bea8d36-c4dd-45e1-9549-abb41e38d726"]),
+        ),
+        (EXAMPLE_KEYSET, raw_cursor(["2020-01-01T00:00:00+00:00", "not a uuid"])),
+    ],
+)
+def test_invalid_cursor(keyset, cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, keyset)
+    assert error.value.status_code == 400
+
+
+def test_rows_version_of_an_empty_page():
+    # "md5(string_agg(...))" of no rows is NULL
+    assert rows_version([]) is None
+
+
+def test_rows_version_hashes_timestamps_as_epoch_microseconds():
+    updated_at = datetime(1970, 1, 1, 0, 0, 1, 5, tzinfo=timezone.utc)
+    rows = [(1, updated_at), (2, updated_at + timedelta(days=1))]
+    expected = hashlib.md5(b"1:1000005,2:86401000005").hexdigest()
+    assert rows_version(rows) == expected
+
+
+def test_rows_version_ignores_the_time_zone():
+    updated_at = datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+    shifted = updated_at.astimezone(timezone(timedelta(hours=-5)))
+    uuid = UUID(int=1)
+    assert rows_version([(updated_at, uuid, updated_at)]) == rows_version(
+        [(shifted, uuid, shifted)]
+    )
@@ -0,0 +1,66 @@
+"""
+Plans of the "/foxes", "/dogs" and "/search" queries, run with EXPLAIN (ANALYZE)
+on the database of "TEST_DATABASE_URL" and skipped without it. The database has
+to be migrated and seeded with "benchmarks.seed --scale 1" or more, on small
+tables a "Seq Scan" is the cheaper plan.
+
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/postgres python -m pytest
+"""
+
+### IMPORTS ###
+# External Libraries
+import os
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Internal Libraries
+from benchmarks.query_plans import (
+    CASES,
+    SEARCH_INDEXES,
+    SEARCHES,
+    TABLES,
+    check,
+    explain,
+    filter_case,
+    has_trigrams,
+)
+from app.example import service
+
+
+### CODE ###
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set"),
+]
+
+
+@pytest.fixture
+async def connection():
+    engine = create_async_engine(DATABASE_URL)
+    async with engine.connect() as connection:
+        yield connection
+    await engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "table", TABLES, ids=[model.__tablename__ for model, _, _ in TABLES]
+)
+@pytest.mark.parametrize("params, expected", CASES, ids=[str(p) for p, _ in CASES])
+async def test_filter_uses_its_index(connection, table, params, expected):
+    _, statement, expected_indexes = filter_case(*table, params, expected)
+    result = check(await explain(connection, statement), expected_indexes)
+    assert "Seq Scan" not in result["node_types"]
+    assert set(expected_indexes) <= set(result["indexes"])
+
+
+@pytest.mark.parametrize("q", SEARCHES)
+async def test_search_uses_trigram_indexes(connection, q):
+    assert await has_trigrams(connection), "pg_trgm is not installed"
+    result = check(
+        await explain(connection, service.search_statement(q, 20)), SEARCH_INDEXES
+    )
+    assert "Seq Scan" not in result["node_types"]
+    assert set(SEARCH_INDEXES) <= set(result["indexes"])
@@ -0,0 +1,38 @@
+### IMPORTS ###
+# External Libraries
+from uuid import uuid4
+
+# Internal Libraries
+from app.auth.revocation import BloomFilter, RevocationList
+
+
+### CODE ###
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [str(uuid4()) for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(1000, 0.01)
+    for _ in range(1000):
+        bloom.add(str(uuid4()))
+    false_positives = sum(str(uuid4()) in bloom for _ in range(20_000))
+    # 1% expected, with room for the randomness of the keys
+    assert false_positives / 20_000 < 0.02
+
+
+def test_empty_bloom_filter_contains_nothing():
+    bloom = BloomFilter(0, 0.001)
+    assert "jti" not in bloom
+
+
+def test_revocation_list_asks_the_database_until_it_is_built():
+    revocation_list = RevocationList(0.001)
+    assert revocation_list.check("jti") is None
+    revocation_list.add("revoked")
+    assert revocation_list.check("revoked") is True
@@ -0,0 +1,59 @@
+### IMPORTS ###
+# External Libraries
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+# Internal Libraries
+from app.sql_timing import (
+    RequestSqlStats,
+    _after_cursor_execute,
+    _before_cursor_execute,
+    _request_stats,
+)
+
+
+### CODE ###
+
+
+@pytest.fixture
+def engine():
+    # The listeners only use the sync engine, SQLite stands in for PostgreSQL
+    engine = create_engine("sqlite://")
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def stats():
+    stats = RequestSqlStats(count_shapes=True)
+    token = _request_stats.set(stats)
+    yield stats
+    _request_stats.reset(token)
+
+
+def test_counts_statements_and_shapes(engine, stats):
+    with engine.connect() as conn:
+        for i in range(3):
+            conn.execute(text("SELECT :i"), {"i": i})
+    assert stats.statements == 3
+    assert stats.duration > 0
+    assert stats.shapes == {"SELECT ?": 3}
+
+
+def test_failed_statement_leaves_nothing_behind(engine, stats):
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing"))
+        conn.execute(text("SELECT 1"))
+        assert not conn.info
+    # Only the statement that returned is counted
+    assert stats.statements == 1
+
+
+def test_outside_of_requests_is_not_counted(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert _request_stats.get() is None